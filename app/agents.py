@@ -0,0 +1,130 @@
+import os
+import re
+import asyncio
+import tomllib
+
+from google.genai import types
+from google.adk.agents import Agent
+from google.adk.tools import google_search
+
+# Tools a profile can name
+TOOLS = {
+    "google_search": google_search,
+}
+
+GENERATION_KEYS = ("max_output_tokens", "temperature", "top_p", "top_k")
+PROFILE_KEYS = {"name", "model", "description", "instruction", "tools", *GENERATION_KEYS}
+
+
+class AgentProfileError(Exception):
+    """An unknown profile, or a profiles file that can't be used"""
+
+
+class AgentProfile:
+    """A built agent and the runner shared by every session using it"""
+
+    def __init__(self, name: str, agent, runner, options: dict):
+        self.name = name
+        self.agent = agent
+        self.runner = runner
+        self.options = options
+
+    def describe(self) -> dict:
+        return {
+            "agent": self.agent.name,
+            "model": self.options["model"],
+            "description": self.options.get("description", ""),
+            "tools": self.options.get("tools", []),
+            **{key: self.options[key] for key in GENERATION_KEYS if key in self.options},
+        }
+
+
+def build_agent(profile: str, options: dict):
+    """Builds the ADK agent for one profile of the file"""
+    unknown = set(options) - PROFILE_KEYS
+    if unknown:
+        raise AgentProfileError(f"Profile {profile}: unknown keys {sorted(unknown)}")
+    if not options.get("model"):
+        raise AgentProfileError(f"Profile {profile}: missing model")
+    tools = []
+    for tool in options.get("tools", []):
+        if tool not in TOOLS:
+            raise AgentProfileError(f"Profile {profile}: unknown tool {tool}")
+        tools.append(TOOLS[tool])
+
+    generation = {key: options[key] for key in GENERATION_KEYS if key in options}
+    return Agent(
+        # ADK agent names must be identifiers
+        name=options.get("name") or re.sub(r"\W", "_", f"{profile}_agent"),
+        model=options["model"],
+        description=options.get("description", ""),
+        instruction=options.get("instruction", "").strip(),
+        tools=tools,
+        generate_content_config=types.GenerateContentConfig(**generation) if generation else None,
+    )
+
+
+class AgentRegistry:
+    """Agent profiles read from a TOML file, each built once and shared
+
+    The file is re-read when it changes. A file that fails to load is
+    reported and the previous profiles stay in use. Sessions keep their live
+    stream's agent; a changed profile applies from the next stream they open.
+    """
+
+    def __init__(self, path: str, build_runner):
+        self.path = path
+        self.build_runner = build_runner
+        self.profiles = {}
+        self.default = None
+        self.mtime = None
+        self.load()
+
+    def load(self):
+        """Builds every profile of the file and swaps them in together"""
+        mtime = os.stat(self.path).st_mtime
+        try:
+            with open(self.path, "rb") as f:
+                config = tomllib.load(f)
+        except ValueError as e:
+            raise AgentProfileError(f"{self.path}: {e}")
+        profiles = {}
+        for name, options in config.get("agents", {}).items():
+            agent = build_agent(name, options)
+            profiles[name] = AgentProfile(name, agent, self.build_runner(agent), options)
+        default = config.get("default") or next(iter(profiles), None)
+        if default not in profiles:
+            raise AgentProfileError(f"{self.path}: default profile {default} is not defined")
+        self.profiles = profiles
+        self.default = default
+        self.mtime = mtime
+        print(f"[AGENTS LOADED] {', '.join(profiles)} (default {default})")
+
+    def get(self, name: str = None) -> AgentProfile:
+        profile = self.profiles.get(name or self.default)
+        if profile is None:
+            # The name comes from the client: quoted and cut short in the reply
+            raise AgentProfileError(f"Unknown agent {name[:64]!r}")
+        return profile
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            print(f"[AGENTS RELOAD FAILED]: {str(e)}")
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            self.load()
+            return True
+        except (OSError, AgentProfileError, TypeError, ValueError) as e:
+            # Wait for the next edit rather than failing on every check
+            self.mtime = mtime
+            print(f"[AGENTS RELOAD FAILED]: {str(e)}")
+            return False
+
+    async def watch(self, interval: float = 5):
+        while True:
+            await asyncio.sleep(interval)
+            self.reload_if_changed()
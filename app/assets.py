@@ -0,0 +1,255 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import mimetypes
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Files served from memory; anything larger (or added later) is left to StaticFiles
+MAX_ASSET_SIZE = 512 * 1024
+COMPRESSIBLE = re.compile(r"^(text/|application/(javascript|json|xml)|image/svg)")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Entry points keep their name (they are what links point at)
+ENTRY_POINTS = {"index.html"}
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """style.css -> style.<digest>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def compress(data: bytes, content_type: str) -> dict:
+    """gzip and brotli versions of the data, when they are smaller"""
+    if not COMPRESSIBLE.match(content_type):
+        return {}
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+def source_files(static_dir: str) -> dict:
+    """name -> bytes for the small files at the top of the static directory"""
+    files = {}
+    for name in sorted(os.listdir(static_dir)):
+        path = os.path.join(static_dir, name)
+        if os.path.isfile(path) and os.path.getsize(path) <= MAX_ASSET_SIZE:
+            with open(path, "rb") as f:
+                files[name] = f.read()
+    return files
+
+
+def build(files: dict, prefix: str = "/static/"):
+    """Fingerprints and compresses the assets
+
+    Returns the manifest (name -> fingerprinted name) and every output file
+    (name -> bytes), including the .gz/.br versions. References to assets in
+    the entry points are rewritten to the fingerprinted names.
+    """
+    manifest = {}
+    outputs = {}
+    for name, data in files.items():
+        if name not in ENTRY_POINTS:
+            manifest[name] = fingerprinted_name(name, content_hash(data))
+            outputs[manifest[name]] = data
+
+    for name in ENTRY_POINTS & set(files):
+        text = files[name].decode("utf-8")
+        for original, fingerprinted in manifest.items():
+            text = text.replace(f"{prefix}{original}", f"{prefix}{fingerprinted}")
+        outputs[name] = text.encode("utf-8")
+
+    for name, data in list(outputs.items()):
+        for encoding, body in compress(data, guess_type(name)).items():
+            outputs[f"{name}.{'br' if encoding == 'br' else 'gz'}"] = body
+    return manifest, outputs
+
+
+def write_build(static_dir: str) -> str:
+    """Writes the build next to the sources (static/build), returns its path"""
+    files = source_files(static_dir)
+    manifest, outputs = build(files)
+    build_dir = os.path.join(static_dir, BUILD_DIR)
+    os.makedirs(build_dir, exist_ok=True)
+    for name in os.listdir(build_dir):
+        os.remove(os.path.join(build_dir, name))
+    for name, data in outputs.items():
+        with open(os.path.join(build_dir, name), "wb") as f:
+            f.write(data)
+    with open(os.path.join(build_dir, MANIFEST), "w") as f:
+        json.dump({
+            "assets": manifest,
+            "sources": {name: content_hash(data) for name, data in files.items()},
+            "brotli": brotli is not None,
+        }, f, indent=2)
+    return build_dir
+
+
+def guess_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Encodings the client accepts (q=0 excluded)"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class Asset:
+    """One file held in memory with its encodings and fixed headers"""
+
+    def __init__(self, name: str, data: bytes, variants: dict, immutable: bool):
+        self.name = name
+        self.content_type = guess_type(name)
+        digest = content_hash(data)
+        # Each representation gets its own strong ETag
+        self.bodies = {"identity": data, **variants}
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+
+    def response(self, headers) -> Response:
+        accepted = accepted_encodings(headers.get("accept-encoding", ""))
+        encoding = next(
+            (e for e in ("br", "gzip") if e in self.bodies and e in accepted), "identity"
+        )
+        response_headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match:
+            # Only the representation being sent counts: a br ETag must not
+            # validate the copy of a client that can only take gzip
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or self.etags[encoding] in tags:
+                return Response(status_code=304, headers=response_headers)
+        return Response(
+            self.bodies[encoding], media_type=self.content_type, headers=response_headers
+        )
+
+
+class StaticAssets:
+    """The static files, fingerprinted and precompressed, served from memory
+
+    Uses the build written by scripts/build_static.py when it matches the
+    sources, and otherwise builds in memory at startup. Fingerprinted names
+    are cached for a year; entry points and the original names revalidate
+    with their ETag.
+    """
+
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self.assets = {}
+        self.manifest = {}
+        self.source = None
+
+    def load(self):
+        files = source_files(self.static_dir)
+        outputs = self._load_build(files)
+        if outputs is None:
+            self.manifest, outputs = build(files)
+            self.source = "memory"
+        else:
+            self.source = "build"
+
+        assets = {}
+        fingerprinted = set(self.manifest.values())
+        for name, data in outputs.items():
+            if name.endswith((".gz", ".br")):
+                continue
+            variants = {
+                encoding: outputs[f"{name}.{suffix}"]
+                for encoding, suffix in (("gzip", "gz"), ("br", "br"))
+                if f"{name}.{suffix}" in outputs
+            }
+            assets[name] = Asset(name, data, variants, immutable=name in fingerprinted)
+        # The original names still work (e.g. cached pages, direct links)
+        for original, name in self.manifest.items():
+            variants = {e: b for e, b in assets[name].bodies.items() if e != "identity"}
+            assets[original] = Asset(original, outputs[name], variants, immutable=False)
+        self.assets = assets
+        print(f"[ASSETS] {len(self.manifest)} fingerprinted, "
+              f"{sum(len(a.bodies) for a in assets.values())} representations "
+              f"in memory (from {self.source}, brotli {'on' if brotli else 'off'})")
+
+    def _load_build(self, files: dict):
+        """The prebuilt outputs, or None if missing or stale"""
+        build_dir = os.path.join(self.static_dir, BUILD_DIR)
+        try:
+            with open(os.path.join(build_dir, MANIFEST)) as f:
+                manifest = json.load(f)
+            if manifest["sources"] != {name: content_hash(data) for name, data in files.items()}:
+                print("[ASSETS] build is stale, building in memory")
+                return None
+            outputs = {}
+            for name in os.listdir(build_dir):
+                if name != MANIFEST:
+                    with open(os.path.join(build_dir, name), "rb") as f:
+                        outputs[name] = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        self.manifest = manifest["assets"]
+        return outputs
+
+    def response(self, name: str, headers):
+        asset = self.assets.get(name)
+        return asset.response(headers) if asset is not None else None
+
+
+class StaticAssetsApp:
+    """ASGI app for /static: in-memory assets first, then the fallback app"""
+
+    def __init__(self, assets: StaticAssets, fallback):
+        self.assets = assets
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            # Depending on the Starlette version the mount prefix may still be in the path
+            path, root_path = scope["path"], scope.get("root_path", "")
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            name = path.lstrip("/")
+            headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+            response = self.assets.response(name, headers)
+            if response is not None:
+                await response(scope, receive, send)
+                return
+        await self.fallback(scope, receive, send)
@@ -0,0 +1,48 @@
+def event_text(event) -> str:
+    """Joins the text of every part of the event (model thoughts excluded)"""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(
+        part.text
+        for part in event.content.parts
+        if part.text and not getattr(part, "thought", False)
+    )
+
+
+def grounding_sources(grounding_metadata):
+    """Yields (uri, title) for each web/retrieval source in the metadata"""
+    for chunk in grounding_metadata.grounding_chunks or ():
+        source = chunk.web or chunk.retrieved_context
+        if source is not None and source.uri:
+            title = source.title or getattr(source, "domain", None) or source.uri
+            yield source.uri, title
+
+
+class CitationTracker:
+    """Turns grounding metadata into citation frames
+
+    Each source is sent once per turn, since the client lists sources under
+    each answer; its index stays the same for the whole session.
+    """
+
+    def __init__(self):
+        self.seen = {}
+        self.sent = set()
+
+    def new_citations(self, event):
+        metadata = getattr(event, "grounding_metadata", None)
+        if metadata is None:
+            return []
+        citations = []
+        for uri, title in grounding_sources(metadata):
+            if uri in self.sent:
+                continue
+            self.sent.add(uri)
+            if uri not in self.seen:
+                self.seen[uri] = len(self.seen) + 1
+            citations.append({"index": self.seen[uri], "uri": uri, "title": title})
+        return citations
+
+    def end_turn(self):
+        """The next answer lists its sources again, even ones cited before"""
+        self.sent.clear()
@@ -1,7 +1,12 @@
 import os
 import sys
 import json
+import time
+import uuid
 import asyncio
+import secrets
+from collections import deque
+from contextlib import asynccontextmanager
 
 # Add the parent directory to the Python path so we can import our local modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -19,13 +24,20 @@ from google.adk.agents import LiveRequestQueue
 from google.adk.agents.run_config import RunConfig
 from google.adk.sessions.in_memory_session_service import InMemorySessionService
 
-from fastapi import FastAPI, WebSocket, Request
+from fastapi import FastAPI, WebSocket, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Now this import should work
-from app.google_search_agent.agent import root_agent
+from app.agents import AgentRegistry, AgentProfileError
+from app.assets import StaticAssets, StaticAssetsApp
+from app.monitoring import ServingState
+from app.profiling import SlowCallbackWatchdog, SamplingProfiler, TaskTimer
+from app.tracing import TraceExporter, TurnTracer
+from app.multiplex import Multiplexer, MultiplexError
+from app.citations import CitationTracker, event_text
+from app.tenancy import TenantRegistry, TenantError, TurnMeter
 
 #
 # ADK Streaming
@@ -37,23 +49,75 @@ load_dotenv()
 APP_NAME = "ADK Streaming example"
 session_service = InMemorySessionService()
 
+# Agent profiles (model, instruction, tools, generation limits) picked per
+# connection; each is built once with its Runner, and the file is re-read
+# when it changes
+AGENTS_FILE = os.getenv(
+    "AGENTS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents.toml")
+)
+AGENTS_RELOAD_INTERVAL = float(os.getenv("AGENTS_RELOAD_INTERVAL", "5"))
+agents = AgentRegistry(
+    AGENTS_FILE,
+    build_runner=lambda agent: Runner(
+        app_name=APP_NAME,
+        agent=agent,
+        session_service=session_service,
+    ),
+)
+
+# Readiness thresholds (the load balancer takes us out of rotation past these)
+serving_state = ServingState(
+    max_sessions=int(os.getenv("MAX_ACTIVE_SESSIONS", "100")),
+    max_loop_lag=float(os.getenv("READY_MAX_LOOP_LAG", "0.5")),
+    max_error_rate=float(os.getenv("READY_MAX_ERROR_RATE", "0.5")),
+    error_window=float(os.getenv("READY_ERROR_WINDOW", "60")),
+)
+
+# Instrumentation: stalls on the event loop, on-demand sampling, task timings
+watchdog = SlowCallbackWatchdog(
+    threshold=float(os.getenv("SLOW_CALLBACK_THRESHOLD", "0.25"))
+)
+profiler = SamplingProfiler()
+task_timer = TaskTimer()
+
+# Per-turn latency traces, written as OTLP/JSON lines when TRACE_FILE is set
+trace_exporter = TraceExporter(path=os.getenv("TRACE_FILE"))
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Close the upstream live stream after this many idle seconds (0 = never)
+LIVE_IDLE_TIMEOUT = float(os.getenv("LIVE_IDLE_TIMEOUT", "300"))
+
+# A dropped /ws connection can resume its session within RESUME_GRACE seconds;
+# the last RESUME_BUFFER frames are kept to replay what the client missed
+RESUME_GRACE = float(os.getenv("RESUME_GRACE", "30"))
+RESUME_BUFFER = int(os.getenv("RESUME_BUFFER", "1024"))
+
+# API keys and per-tenant quotas (auth is off unless TENANTS_FILE is set);
+# usage counters are flushed to USAGE_FILE every USAGE_FLUSH_INTERVAL seconds
+tenants = TenantRegistry(path=os.getenv("TENANTS_FILE"), usage_path=os.getenv("USAGE_FILE"))
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "30"))
 
-def start_agent_session(session_id: str):
-    """Starts an agent session"""
 
-    # Create a Session
-    session = session_service.create_session(
+def start_agent_session(session_id: str, user_id: str = None, profile=None):
+    """Starts an agent session (session_id is the server's ADK session id)"""
+
+    # Reuse the Session if we have one, so a reopened stream keeps its history
+    session = session_service.get_session(
         app_name=APP_NAME,
-        user_id=session_id,
+        user_id=user_id or session_id,
         session_id=session_id,
     )
+    if session is None:
+        session = session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id or session_id,
+            session_id=session_id,
+        )
 
-    # Create a Runner
-    runner = Runner(
-        app_name=APP_NAME,
-        agent=root_agent,
-        session_service=session_service,
-    )
+    # The profile's Runner is shared by all of its sessions
+    runner = (profile or agents.get()).runner
 
     # Set response modality = TEXT
     run_config = RunConfig(response_modalities=["TEXT"])
@@ -70,57 +134,398 @@ def start_agent_session(session_id: str):
     return live_events, live_request_queue
 
 
-async def agent_to_client_messaging(websocket, live_events):
+def end_agent_session(session_id: str, user_id: str = None):
+    """Deletes the ADK session and its history"""
+    session_service.delete_session(
+        app_name=APP_NAME,
+        user_id=user_id or session_id,
+        session_id=session_id,
+    )
+
+
+def websocket_sender(websocket):
+    """Returns an async send(frame) that writes JSON frames to the websocket"""
+    async def send(frame: dict):
+        await websocket.send_text(json.dumps(frame))
+    return send
+
+
+def send_user_message(live_request_queue, tracer, text: str):
+    """Forwards a user message to the live session"""
+    tracer.message_received()
+    content = Content(role="user", parts=[Part.from_text(text=text)])
+    live_request_queue.send_content(content=content)
+    tracer.mark("enqueued")
+
+
+async def agent_to_client_messaging(send, live_events, tracer, citations, meter=None):
     """Agent to client communicaation"""
     try:
         async for event in live_events:
-            # turn_complete
-            if event.turn_complete:
-                await websocket.send_text(json.dumps({"turn_complete": True}))
-                print("[TURN COMPLETE]")
+            tracer.on_event(event)
+            if meter:
+                meter.on_event(event)
+
+            # Text of all parts goes out first; only partial events carry new
+            # text, the final event repeats the whole answer
+            text = event_text(event) if event.partial else ""
+            if text:
+                await send({"message": text})
+                tracer.text_sent(text)
+                if meter:
+                    meter.text_sent(text)
+                print(f"[AGENT TO CLIENT]: {text}")
+
+            # Then the search sources behind the answer, once per source
+            for citation in citations.new_citations(event):
+                await send({"citation": citation})
+                print(f"[CITATION]: {citation['uri']}")
+
+            if event.error_code:
+                serving_state.upstream.record(ok=False)
+                print(f"[UPSTREAM ERROR]: {event.error_code} {event.error_message}")
 
             if event.interrupted:
-                await websocket.send_text(json.dumps({"interrupted": True}))
+                tracer.mark("interrupted")
+                await send({"interrupted": True})
                 print("[INTERRUPTED]")
 
-            # Read the Content and its first Part
-            part: Part = (
-                event.content and event.content.parts and event.content.parts[0]
-            )
-            if not part or not event.partial:
-                continue
-
-            # Get the text
-            text = event.content and event.content.parts and event.content.parts[0].text
-            if not text:
-                continue
+            # turn_complete
+            if event.turn_complete:
+                serving_state.upstream.record(ok=True)
+                trace_id = tracer.complete()
+                citations.end_turn()
+                if meter:
+                    meter.complete()
+                await send({"turn_complete": True, "trace_id": trace_id})
+                print("[TURN COMPLETE]")
 
-            # Send the text to the client
-            await websocket.send_text(json.dumps({"message": text}))
-            print(f"[AGENT TO CLIENT]: {text}")
             await asyncio.sleep(0)
     except Exception as e:
+        serving_state.upstream.record(ok=False)
         print(f"Error in agent to client messaging: {str(e)}")
-
-
-async def client_to_agent_messaging(websocket, live_request_queue):
+        error = "Upstream stream failed"
+    else:
+        if tracer.current is not None:
+            serving_state.upstream.record(ok=False)
+        error = "Upstream stream ended"
+
+    # Cut off mid-answer: end the turn so the client stops waiting for it
+    # (the next message reopens the stream)
+    if tracer.current is not None:
+        trace_id = tracer.complete("error")
+        citations.end_turn()
+        if meter:
+            meter.complete()
+        print(f"[UPSTREAM ERROR]: {error} mid-turn")
+        await send({"error": error, "code": "upstream_error", "trace_id": trace_id})
+
+
+def parse_client_frame(text: str) -> dict:
+    """Reads a client frame: JSON {"type": "message"|"cancel", ...} or plain text"""
+    if text.startswith("{"):
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            frame = None
+        if isinstance(frame, dict) and frame.get("type") in ("message", "cancel"):
+            return frame
+    # Plain text is a message (the original protocol)
+    return {"type": "message", "text": text}
+
+
+async def client_to_agent_messaging(websocket, live_session):
     """Client to agent communication"""
     try:
         while True:
-            text = await websocket.receive_text()
-            content = Content(role="user", parts=[Part.from_text(text=text)])
-            live_request_queue.send_content(content=content)
+            frame = parse_client_frame(await websocket.receive_text())
+            if frame["type"] == "cancel":
+                await live_session.cancel()
+                continue
+            text = frame.get("text", "")
+            try:
+                live_session.send_message(text)
+            except TenantError as e:
+                await live_session.send({"error": str(e), "code": e.code})
+                continue
+            except ValueError as e:
+                await live_session.send({"error": str(e), "code": "bad_request"})
+                continue
             print(f"[CLIENT TO AGENT]: {text}")
             await asyncio.sleep(0)
     except Exception as e:
         print(f"Error in client to agent messaging: {str(e)}")
 
 
+resumable_sessions = {}
+
+
+class LiveSession:
+    """A client conversation whose upstream live stream is opened on demand
+
+    The run_live stream starts with the first user message and is closed once
+    the conversation has been idle for LIVE_IDLE_TIMEOUT seconds. The ADK
+    session (and so the history) outlives the stream and is replayed to the
+    model when the next message reopens it. Its id is generated here, never
+    taken from the client, so conversations that reuse a client id don't
+    share history; it is deleted when the conversation is closed.
+
+    Frames to the client are numbered and the latest ones kept, so a client
+    that reconnects can be attached again and sent only what it missed. Only
+    a client holding the session's resume token may do so, and one socket is
+    attached at a time.
+    """
+
+    open_sessions = set()
+
+    def __init__(self, session_id: str, transport, tracer, tenant, profile=None,
+                 discard=None, replay_size: int = None):
+        self.session_id = session_id
+        self.adk_session_id = uuid.uuid4().hex
+        self.tenant = tenant
+        self.profile = profile or agents.get()
+        self.meter = TurnMeter(tenants, tenant)
+        # Sends a frame to the attached client (None while detached)
+        self.transport = transport
+        # Drops frames queued but not yet sent (multiplexed streams queue them)
+        self.discard = discard
+        self.tracer = tracer
+        self.citations = CitationTracker()
+        self.resume_token = secrets.token_urlsafe(24)
+        # The socket owning the session (set before its replay is done, when
+        # transport isn't yet), and how to close it if another takes over
+        self.attached = transport
+        self.close_transport = None
+        self.seq = 0
+        self.replay = deque(maxlen=RESUME_BUFFER if replay_size is None else replay_size)
+        self.expiry = None
+        self.live_request_queue = None
+        self.task = None
+        self.last_activity = time.monotonic()
+        LiveSession.open_sessions.add(self)
+
+    async def send(self, frame: dict):
+        """Numbers the frame, keeps it for replay and sends it if a client is attached"""
+        self.seq += 1
+        frame = {**frame, "seq": self.seq}
+        self.replay.append(frame)
+        transport = self.transport
+        if transport is None:
+            return
+        try:
+            await transport(frame)
+        except Exception as e:
+            # The answer keeps going into the replay buffer for a resume
+            self.detach(transport)
+            print(f"[DETACHED] #{self.session_id}: {str(e)}")
+
+    def can_resume(self, token: str, last_seq: int) -> bool:
+        """Whether a reconnect carries last_seq and this session's resume token"""
+        return (
+            last_seq is not None
+            and token is not None
+            and secrets.compare_digest(token.encode(), self.resume_token.encode())
+        )
+
+    async def attach(self, transport, last_seq: int = None, close=None):
+        """Points the session at a new socket, replaying frames after last_seq
+
+        close() closes the socket if a newer one takes its place.
+        """
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        previous, close_previous = self.attached, self.close_transport
+        self.transport = None
+        self.attached = transport
+        self.close_transport = close
+        if previous is not None and close_previous is not None:
+            # Still attached (e.g. its drop isn't noticed yet): close it
+            # rather than leave it silently receiving nothing
+            try:
+                await close_previous()
+            except Exception:
+                pass
+        if last_seq is not None:
+            oldest = self.replay[0]["seq"] if self.replay else self.seq + 1
+            resumed = last_seq >= oldest - 1
+            if resumed:
+                # latest: the replay is over once the client has seen this frame
+                await transport({"resumed": True, "seq": last_seq, "latest": self.seq})
+            else:
+                await transport({"resumed": False, "seq": self.seq})
+            sent = last_seq if resumed else self.seq
+            # Frames can arrive while replaying, so loop until caught up
+            # (or until yet another socket took over)
+            while self.attached is transport:
+                missed = [f for f in self.replay if f["seq"] > sent]
+                if not missed:
+                    break
+                for frame in missed:
+                    await transport(frame)
+                    sent = frame["seq"]
+        if self.attached is transport:
+            self.transport = transport
+
+    def detach(self, transport) -> bool:
+        """Forgets the socket if it is still the attached one"""
+        if self.attached is not transport:
+            return False
+        self.transport = None
+        self.attached = None
+        self.close_transport = None
+        return True
+
+    @property
+    def is_live(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start_live(self):
+        """Opens the upstream live stream"""
+        # Pick up the profile's latest version if the file was reloaded
+        self.profile = agents.profiles.get(self.profile.name, self.profile)
+        live_events, self.live_request_queue = start_agent_session(
+            self.adk_session_id, user_id=self.tenant.name, profile=self.profile
+        )
+        self.task = asyncio.create_task(
+            task_timer.timed(
+                self.session_id,
+                "agent_to_client_messaging",
+                agent_to_client_messaging(
+                    self.send, live_events, self.tracer, self.citations, self.meter
+                ),
+            )
+        )
+        self.task.add_done_callback(lambda _: serving_state.live_stream_closed())
+        serving_state.live_stream_opened()
+        print(f"[LIVE STREAM OPENED] #{self.session_id} ({self.profile.name})")
+
+    def stop_live(self):
+        """Closes the upstream live stream, keeping the session and socket"""
+        if self.live_request_queue is not None:
+            self.live_request_queue.close()
+            self.live_request_queue = None
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+            print(f"[LIVE STREAM CLOSED] #{self.session_id}")
+
+    def send_message(self, text: str):
+        """Forwards a user message, (re)opening the live stream if needed
+
+        Raises ValueError for anything but a non-empty string, and TenantError
+        when the tenant is over its rate limit or quota.
+        """
+        if not isinstance(text, str) or not text:
+            raise ValueError("Message text must be a non-empty string")
+        tenants.check_turn(self.tenant)
+        if not self.is_live:
+            self.stop_live()
+            self.start_live()
+        self.last_activity = time.monotonic()
+        self.meter.message_sent(text)
+        send_user_message(self.live_request_queue, self.tracer, text)
+
+    async def cancel(self):
+        """Stops the current answer and frees its upstream stream
+
+        The live API has no way to abort a single turn, so the stream is
+        closed; the next message reopens it with the history.
+        """
+        trace_id = None
+        turn_open = self.tracer.current is not None
+        if turn_open:
+            self.stop_live()
+            # What was generated before the cancel is still billed
+            self.meter.complete()
+        # Frames of the answer still waiting for the client are stale either way
+        discarded = self.discard() if self.discard else 0
+        if turn_open:
+            trace_id = self.tracer.complete("cancelled", discarded=discarded)
+            self.citations.end_turn()
+        else:
+            self.tracer.exporter.discarded_frames += discarded
+        print(f"[CANCELLED] #{self.session_id} ({discarded} queued frames dropped)")
+        # Always acknowledge, so the client knows later frames are a new turn
+        await self.send({"cancelled": True, "trace_id": trace_id})
+
+    def is_idle(self, now: float, timeout: float) -> bool:
+        # Never close mid-answer: an open turn still expects model output
+        return (
+            self.is_live
+            and self.tracer.current is None
+            and now - self.last_activity > timeout
+        )
+
+    def close(self, reason: str = "disconnected"):
+        self.stop_live()
+        self.tracer.complete(reason)
+        self.meter.complete()
+        LiveSession.open_sessions.discard(self)
+        try:
+            end_agent_session(self.adk_session_id, user_id=self.tenant.name)
+        except Exception as e:
+            print(f"[SESSION DELETE FAILED] #{self.session_id}: {str(e)}")
+
+
+def release_session(live_session, transport):
+    """Called when a /ws socket goes away; keeps the session resumable for a while"""
+    live_session.detach(transport)
+    if live_session.attached is not None:
+        # Another socket already took the session over
+        return
+
+    def expire():
+        if live_session.attached is not None:
+            return
+        resumable_sessions.pop((live_session.tenant.name, live_session.session_id), None)
+        live_session.close()
+        tenants.release(live_session.tenant)
+        serving_state.session_closed()
+        print(f"Client #{live_session.session_id} session closed")
+
+    if RESUME_GRACE > 0:
+        live_session.expiry = asyncio.get_running_loop().call_later(RESUME_GRACE, expire)
+    else:
+        expire()
+
+
+async def close_idle_live_streams():
+    """Closes upstream streams of conversations that went quiet"""
+    while True:
+        await asyncio.sleep(min(LIVE_IDLE_TIMEOUT / 4, 30))
+        now = time.monotonic()
+        for live_session in list(LiveSession.open_sessions):
+            if live_session.is_idle(now, LIVE_IDLE_TIMEOUT):
+                live_session.stop_live()
+
+
 #
 # FastAPI web app
 #
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Runs the loop monitors, the idle live stream sweeper and the reloaders"""
+    tasks = [
+        asyncio.create_task(serving_state.loop_lag.run()),
+        asyncio.create_task(watchdog.run()),
+    ]
+    if LIVE_IDLE_TIMEOUT > 0:
+        tasks.append(asyncio.create_task(close_idle_live_streams()))
+    if AGENTS_RELOAD_INTERVAL > 0:
+        tasks.append(asyncio.create_task(agents.watch(AGENTS_RELOAD_INTERVAL)))
+    if tenants.usage_path:
+        tasks.append(asyncio.create_task(tenants.run_flusher(USAGE_FLUSH_INTERVAL)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Saves the tenant usage counters
+    tenants.flush()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to handle requests from different origins (needed for Ngrok)
 app.add_middleware(
@@ -134,13 +539,22 @@ app.add_middleware(
 # Updated path to static directory - use the full path to app/static
 current_dir = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(current_dir, "static")
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+# The small static files are fingerprinted, precompressed and served from
+# memory (scripts/build_static.py prebuilds them); StaticFiles serves the rest
+static_assets = StaticAssets(STATIC_DIR)
+static_assets.load()
+app.mount(
+    "/static",
+    StaticAssetsApp(static_assets, StaticFiles(directory=STATIC_DIR)),
+    name="static",
+)
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serves the index.html"""
-    return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+    return static_assets.response("index.html", request.headers)
 
 
 @app.get("/health")
@@ -148,37 +562,331 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Reports whether this instance has capacity to take more sessions"""
+    ready, details = serving_state.readiness()
+    return JSONResponse(details, status_code=200 if ready else 503)
+
+
+#
+# Admin / profiling endpoints
+#
+
+def check_admin(request: Request):
+    """Rejects the request unless it carries the configured admin token"""
+    token = request.headers.get("x-admin-token") or request.query_params.get("token")
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin access denied")
+
+
+@app.get("/admin/loop")
+async def admin_loop(request: Request):
+    """Event loop lag and recent slow callbacks"""
+    check_admin(request)
+    return {
+        "loop_lag_ms": round(serving_state.loop_lag.lag * 1000, 1),
+        "loop_lag_max_ms": round(serving_state.loop_lag.maximum() * 1000, 1),
+        "slow_callback_threshold_ms": round(watchdog.threshold * 1000),
+        "slow_callbacks": list(watchdog.recent),
+    }
+
+
+@app.get("/admin/loop/stalls", response_class=PlainTextResponse)
+async def admin_loop_stalls(request: Request):
+    """Stacks caught blocking the loop, in flamegraph folded format"""
+    check_admin(request)
+    return watchdog.folded()
+
+
+@app.post("/admin/profile/start")
+async def admin_profile_start(request: Request, interval: float = 0.01):
+    """Starts the sampling profiler (interval in seconds, at least 1 ms)"""
+    check_admin(request)
+    try:
+        started = profiler.start(interval=interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"running": True, "started": started, "interval": profiler.interval}
+
+
+@app.post("/admin/profile/stop", response_class=PlainTextResponse)
+async def admin_profile_stop(request: Request):
+    """Stops the sampling profiler and returns folded stacks"""
+    check_admin(request)
+    if not profiler.running:
+        raise HTTPException(status_code=409, detail="Profiler is not running")
+    return profiler.stop()
+
+
+@app.get("/admin/tasks")
+async def admin_tasks(request: Request, format: str = "json"):
+    """Per-session messaging task timings (json, or folded for flamegraphs)"""
+    check_admin(request)
+    if format == "folded":
+        return PlainTextResponse(task_timer.folded())
+    return {"tasks": task_timer.snapshot()}
+
+
+@app.get("/admin/turns")
+async def admin_turns(request: Request):
+    """Per-turn latency breakdowns (time to first token, tool and stream time)"""
+    check_admin(request)
+    return trace_exporter.report()
+
+
+@app.get("/admin/tenants")
+async def admin_tenants(request: Request):
+    """Per-tenant sessions, requests and tokens (today and all time)"""
+    check_admin(request)
+    return tenants.snapshot()
+
+
+@app.post("/admin/tenants/reload")
+async def admin_tenants_reload(request: Request):
+    """Re-reads TENANTS_FILE (new keys and limits apply to new messages)"""
+    check_admin(request)
+    if not tenants.enabled:
+        raise HTTPException(status_code=409, detail="TENANTS_FILE is not set")
+    try:
+        tenants.load(tenants.path)
+    except (OSError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not load tenants: {e}")
+    return {"tenants": sorted(tenants.tenants)}
+
+
+@app.get("/admin/agents")
+async def admin_agents(request: Request):
+    """The agent profiles in use"""
+    check_admin(request)
+    return {
+        "file": agents.path,
+        "default": agents.default,
+        "agents": {name: profile.describe() for name, profile in agents.profiles.items()},
+    }
+
+
+@app.post("/admin/agents/reload")
+async def admin_agents_reload(request: Request):
+    """Re-reads AGENTS_FILE now (it is also re-read when it changes)"""
+    check_admin(request)
+    try:
+        agents.load()
+    except (OSError, AgentProfileError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not load agents: {e}")
+    return {"default": agents.default, "agents": sorted(agents.profiles)}
+
+
+#
+# Client websockets
+#
+
+# Close code for a connection asking for an agent profile that doesn't exist
+UNKNOWN_AGENT = 4404
+# Close codes for a resume without the session's token, and for a socket
+# whose session was taken over by a newer one
+RESUME_REFUSED = 4403
+SESSION_REPLACED = 4409
+
+
+def client_api_key(websocket: WebSocket):
+    """The x-api-key header, or ?api_key= for browsers (they can't set headers)"""
+    return websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+
+
+async def refuse(websocket: WebSocket, message: str, code: str, close_code: int):
+    """Tells the client why it is refused and closes the socket"""
+    await websocket.send_text(json.dumps({"error": message, "code": code}))
+    await websocket.close(code=close_code)
+
+
 @app.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """Client websocket endpoint"""
+async def websocket_endpoint(websocket: WebSocket, session_id: str, last_seq: int = None):
+    """Client websocket endpoint
+
+    ?agent=<profile> picks the agent profile (the default one otherwise).
+    A new session's first frame is {"resume_token": ...}. A client
+    reconnecting with ?last_seq=N&resume_token=... gets
+    {"resumed": true, "latest": ...} and every frame after N, or
+    {"resumed": false, "seq": ...} if those are gone.
+    """
 
     # Wait for client connection
     await websocket.accept()
-    print(f"Client #{session_id} connected")
+    transport = websocket_sender(websocket)
+
+    async def replaced():
+        await websocket.close(code=SESSION_REPLACED)
 
     try:
-        # Start agent session
-        live_events, live_request_queue = start_agent_session(session_id)
+        tenant = tenants.authenticate(client_api_key(websocket))
+        # Session ids are only unique within a tenant
+        live_session = resumable_sessions.get((tenant.name, session_id))
+        if live_session is None:
+            profile = agents.get(websocket.query_params.get("agent"))
+            tenants.admit(tenant)
+    except TenantError as e:
+        print(f"Client #{session_id} refused: {str(e)}")
+        await refuse(websocket, str(e), e.code, e.close_code)
+        return
+    except AgentProfileError as e:
+        print(f"Client #{session_id} refused: {str(e)}")
+        await refuse(websocket, str(e), "unknown_agent", UNKNOWN_AGENT)
+        return
+
+    # Knowing a session id isn't enough to take the conversation over
+    if live_session is not None and not live_session.can_resume(
+        websocket.query_params.get("resume_token"), last_seq
+    ):
+        print(f"Client #{session_id} refused: no valid resume token")
+        await refuse(websocket, "Session is in use", "resume_refused", RESUME_REFUSED)
+        return
 
-        # Start tasks
-        agent_to_client_task = asyncio.create_task(
-            agent_to_client_messaging(websocket, live_events)
-        )
-        client_to_agent_task = asyncio.create_task(
-            client_to_agent_messaging(websocket, live_request_queue)
-        )
-        
-        # Wait for both tasks to complete
-        done, pending = await asyncio.wait(
-            [agent_to_client_task, client_to_agent_task],
-            return_when=asyncio.FIRST_COMPLETED
-        )
+    try:
+        if live_session is not None:
+            print(f"Client #{session_id} reconnected (last_seq={last_seq})")
+            await live_session.attach(transport, last_seq, close=replaced)
+        else:
+            print(f"Client #{session_id} connected")
+            serving_state.session_opened()
+            tracer = TurnTracer(session_id, trace_exporter)
+
+            # The agent session's live stream is only opened by the first message
+            live_session = LiveSession(session_id, None, tracer, tenant, profile)
+            resumable_sessions[(tenant.name, session_id)] = live_session
+            await transport({"resume_token": live_session.resume_token})
+            if last_seq:
+                # e.g. the server restarted: nothing to resume
+                await transport({"resumed": False, "seq": 0})
+            await live_session.attach(transport, close=replaced)
+    except Exception as e:
+        print(f"WebSocket error: {str(e)}")
+        release_session(live_session, transport)
+        return
 
-        # Cancel pending tasks
-        for task in pending:
-            task.cancel()
+    try:
+        # Runs until the client goes away
+        await task_timer.timed(
+            session_id,
+            "client_to_agent_messaging",
+            client_to_agent_messaging(websocket, live_session),
+        )
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
-        # Disconnected
-        print(f"Client #{session_id} disconnected")
\ No newline at end of file
+        # Disconnected, the session stays resumable for RESUME_GRACE seconds
+        release_session(live_session, transport)
+        print(f"Client #{session_id} disconnected")
+
+
+async def open_stream(mux, stream_id: str, tenant, window: int = None, agent: str = None):
+    """Opens one stream of a multiplexed socket (its live stream starts lazily)"""
+    profile = agents.get(agent)
+    stream = mux.open(stream_id, window=window)
+    try:
+        tenants.admit(tenant)
+    except TenantError:
+        mux.close(stream_id)
+        raise
+    serving_state.session_opened()
+    tracer = TurnTracer(stream_id, trace_exporter)
+    stream.state = LiveSession(
+        stream_id, stream.send, tracer, tenant, profile,
+        discard=stream.discard, replay_size=0,
+    )
+    mux.send_control(stream_id, {"opened": True})
+    print(f"Stream #{stream_id} opened")
+
+
+def close_stream(mux, stream_id: str, reason: str = "closed"):
+    """Stops a stream's agent session and drops its queued frames"""
+    stream = mux.close(stream_id)
+    if stream is None:
+        return
+    stream.state.close(reason)
+    tenants.release(stream.state.tenant)
+    serving_state.session_closed()
+    print(f"Stream #{stream_id} {reason}")
+
+
+@app.websocket("/mux")
+async def multiplexed_websocket_endpoint(websocket: WebSocket):
+    """Carries many conversations over one websocket
+
+    Every frame names its stream. Client frames:
+      {"stream": id, "type": "open", "window": n, "agent": name}   both optional
+      {"stream": id, "type": "message", "text": "..."}
+      {"stream": id, "type": "cancel"}
+      {"stream": id, "type": "credit", "frames": n}
+      {"stream": id, "type": "close"}
+    Server frames are the usual /ws frames plus "stream", and the control
+    frames {"opened": true}, {"closed": true} and {"error": "..."}.
+    """
+    await websocket.accept()
+    try:
+        tenant = tenants.authenticate(client_api_key(websocket))
+    except TenantError as e:
+        print(f"Multiplexed client refused: {str(e)}")
+        await refuse(websocket, str(e), e.code, e.close_code)
+        return
+    print("Multiplexed client connected")
+    mux = Multiplexer(websocket.send_text)
+    writer_task = asyncio.create_task(mux.run())
+
+    def writer_stopped(task):
+        # Without the writer no stream gets frames: drop the socket rather
+        # than keep reading from a client that will never hear back
+        if task.cancelled() or task.exception() is None:
+            return
+        print(f"Multiplexed writer failed: {task.exception()!r}")
+        asyncio.create_task(close_socket())
+
+    async def close_socket():
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+    writer_task.add_done_callback(writer_stopped)
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            if writer_task.done():
+                break
+            stream_id = None
+            try:
+                frame = mux.parse(text)
+                stream_id = frame.get("stream")
+                kind = frame.get("type")
+                if kind == "open":
+                    await open_stream(
+                        mux, stream_id, tenant,
+                        window=frame.get("window"), agent=frame.get("agent"),
+                    )
+                elif kind == "message":
+                    mux.get(stream_id).state.send_message(frame.get("text", ""))
+                    print(f"[CLIENT TO AGENT] #{stream_id}: {frame.get('text')}")
+                elif kind == "cancel":
+                    await mux.get(stream_id).state.cancel()
+                elif kind == "credit":
+                    mux.get(stream_id).grant(frame.get("frames"))
+                elif kind == "close":
+                    mux.get(stream_id)
+                    close_stream(mux, stream_id)
+                    mux.send_control(stream_id, {"closed": True})
+                else:
+                    raise MultiplexError(f"Unknown frame type {kind}")
+            except TenantError as e:
+                mux.send_control(stream_id, {"error": str(e), "code": e.code})
+            except AgentProfileError as e:
+                mux.send_control(stream_id, {"error": str(e), "code": "unknown_agent"})
+            except (MultiplexError, ValueError, TypeError) as e:
+                mux.send_control(stream_id, {"error": str(e)})
+    except Exception as e:
+        print(f"Multiplexed websocket error: {str(e)}")
+    finally:
+        for stream_id in list(mux.streams):
+            close_stream(mux, stream_id, reason="disconnected")
+        writer_task.cancel()
+        print("Multiplexed client disconnected")
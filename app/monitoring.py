@@ -0,0 +1,129 @@
+import time
+import asyncio
+from collections import deque
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed sleep"""
+
+    def __init__(self, interval: float = 0.5, window: float = 5.0, warn: float = 0.1):
+        self.interval = interval
+        self.window = window
+        self.warn = warn
+        self.samples = deque()
+        self.lag = 0.0
+
+    async def run(self):
+        """Sample loop lag forever (run as a background task)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.record(now, max(0.0, now - start - self.interval))
+
+    def record(self, now: float, lag: float):
+        self.lag = lag
+        if self.warn and lag > self.warn:
+            print(f"[LOOP LAG]: {lag * 1000:.0f} ms")
+        self.samples.append((now, lag))
+        while self.samples and self.samples[0][0] < now - self.window:
+            self.samples.popleft()
+
+    def average(self) -> float:
+        if not self.samples:
+            return self.lag
+        return sum(lag for _, lag in self.samples) / len(self.samples)
+
+    def maximum(self) -> float:
+        if not self.samples:
+            return self.lag
+        return max(lag for _, lag in self.samples)
+
+
+class UpstreamErrorTracker:
+    """Keeps a rolling window of upstream (model stream) outcomes"""
+
+    def __init__(self, window: float = 60.0, min_samples: int = 5):
+        self.window = window
+        self.min_samples = min_samples
+        self.outcomes = deque()
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        self.outcomes.append((now, ok))
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self.outcomes and self.outcomes[0][0] < now - self.window:
+            self.outcomes.popleft()
+
+    def counts(self):
+        self._trim(time.monotonic())
+        errors = sum(1 for _, ok in self.outcomes if not ok)
+        return len(self.outcomes), errors
+
+    def rate(self) -> float:
+        total, errors = self.counts()
+        if total < self.min_samples:
+            return 0.0
+        return errors / total
+
+
+class ServingState:
+    """Tracks what the readiness probe needs to decide if we can take traffic"""
+
+    def __init__(
+        self,
+        max_sessions: int = 100,
+        max_loop_lag: float = 0.5,
+        max_error_rate: float = 0.5,
+        error_window: float = 60.0,
+    ):
+        self.max_sessions = max_sessions
+        self.max_loop_lag = max_loop_lag
+        self.max_error_rate = max_error_rate
+        self.active_sessions = 0
+        self.live_streams = 0
+        self.loop_lag = LoopLagMonitor()
+        self.upstream = UpstreamErrorTracker(window=error_window)
+
+    def session_opened(self):
+        self.active_sessions += 1
+
+    def session_closed(self):
+        self.active_sessions = max(0, self.active_sessions - 1)
+
+    def live_stream_opened(self):
+        self.live_streams += 1
+
+    def live_stream_closed(self):
+        self.live_streams = max(0, self.live_streams - 1)
+
+    def readiness(self):
+        """Returns (ready, details) for the /ready endpoint"""
+        lag = self.loop_lag.average()
+        total, errors = self.upstream.counts()
+        error_rate = self.upstream.rate()
+
+        reasons = []
+        if lag > self.max_loop_lag:
+            reasons.append("event loop lagging")
+        if self.active_sessions >= self.max_sessions:
+            reasons.append("session limit reached")
+        if error_rate > self.max_error_rate:
+            reasons.append("upstream error rate too high")
+
+        details = {
+            "status": "ok" if not reasons else "unavailable",
+            "reasons": reasons,
+            "loop_lag_ms": round(lag * 1000, 1),
+            "loop_lag_max_ms": round(self.loop_lag.maximum() * 1000, 1),
+            "active_sessions": self.active_sessions,
+            "max_sessions": self.max_sessions,
+            "live_streams": self.live_streams,
+            "upstream_events": total,
+            "upstream_errors": errors,
+            "upstream_error_rate": round(error_rate, 3),
+        }
+        return not reasons, details
@@ -0,0 +1,136 @@
+import json
+import asyncio
+from collections import deque
+
+
+class MultiplexError(Exception):
+    """A client frame that can't be handled on a multiplexed socket"""
+
+
+def positive_int(value, name: str) -> int:
+    """Validates a count sent by the client (bool is not an int here)"""
+    if type(value) is not int or value <= 0:
+        raise MultiplexError(f"{name} must be a positive integer")
+    return value
+
+
+class Stream:
+    """One logical conversation carried over a multiplexed socket
+
+    Outgoing frames wait in a bounded queue, so a slow stream blocks its own
+    producer instead of growing memory. With a window, the stream may only
+    send that many frames until the client grants more credit.
+    """
+
+    def __init__(self, mux, stream_id: str, window: int = None, max_pending: int = 256):
+        self.mux = mux
+        self.id = stream_id
+        self.credit = window
+        self.outgoing = asyncio.Queue(maxsize=max_pending)
+        self.closed = False
+        # Whatever the endpoint attaches to the stream (agent session, tasks)
+        self.state = None
+
+    def can_send(self) -> bool:
+        return not self.outgoing.empty() and (self.credit is None or self.credit > 0)
+
+    def take(self):
+        if self.credit is not None:
+            self.credit -= 1
+        return self.outgoing.get_nowait()
+
+    def discard(self) -> int:
+        """Drops the frames still waiting to be sent, returns how many"""
+        dropped = 0
+        while not self.outgoing.empty():
+            self.outgoing.get_nowait()
+            dropped += 1
+        return dropped
+
+    def grant(self, frames: int):
+        frames = positive_int(frames, "frames")
+        if self.credit is not None:
+            self.credit += frames
+            self.mux.wakeup.set()
+
+    async def send(self, frame: dict):
+        """Queues a frame for this stream (waits while the stream's queue is full)"""
+        if self.closed:
+            return
+        await self.outgoing.put(frame)
+        self.mux.wakeup.set()
+
+
+class Multiplexer:
+    """Schedules frames from many streams fairly onto one socket"""
+
+    def __init__(self, send_text, window: int = None, max_pending: int = 256):
+        self.send_text = send_text
+        self.window = window
+        self.max_pending = max_pending
+        self.streams = {}
+        self.control = deque()
+        self.wakeup = asyncio.Event()
+
+    def open(self, stream_id: str, window: int = None) -> Stream:
+        if not stream_id:
+            raise MultiplexError("Missing stream id")
+        if stream_id in self.streams:
+            raise MultiplexError(f"Stream {stream_id} is already open")
+        if window is not None:
+            window = positive_int(window, "window")
+        stream = Stream(
+            self, stream_id,
+            window=window if window is not None else self.window,
+            max_pending=self.max_pending,
+        )
+        self.streams[stream_id] = stream
+        return stream
+
+    def get(self, stream_id: str) -> Stream:
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            raise MultiplexError(f"Unknown stream {stream_id}")
+        return stream
+
+    def close(self, stream_id: str):
+        """Drops the stream and anything it still had queued"""
+        stream = self.streams.pop(stream_id, None)
+        if stream is not None:
+            stream.closed = True
+        return stream
+
+    def send_control(self, stream_id: str, frame: dict):
+        """Queues a frame that skips flow control (opened/closed/error)"""
+        self.control.append({"stream": stream_id, **frame})
+        self.wakeup.set()
+
+    def parse(self, text: str) -> dict:
+        """Decodes a client frame"""
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            raise MultiplexError("Frames must be JSON objects")
+        if not isinstance(frame, dict):
+            raise MultiplexError("Frames must be JSON objects")
+        return frame
+
+    async def run(self):
+        """Writes queued frames, one per ready stream per round (round robin)"""
+        while True:
+            self.wakeup.clear()
+            sent = False
+
+            while self.control:
+                await self.send_text(json.dumps(self.control.popleft()))
+                sent = True
+
+            for stream in list(self.streams.values()):
+                if stream.closed or not stream.can_send():
+                    continue
+                frame = stream.take()
+                await self.send_text(json.dumps({"stream": stream.id, **frame}))
+                sent = True
+
+            if not sent:
+                await self.wakeup.wait()
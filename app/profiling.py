@@ -0,0 +1,211 @@
+import sys
+import time
+import types
+import asyncio
+import threading
+import traceback
+from collections import Counter, deque
+
+# Shortest sampling interval: anything faster just keeps the GIL from the loop
+MIN_SAMPLE_INTERVAL = 0.001
+
+
+def fold_stack(frame, limit: int = 64) -> str:
+    """Turns a frame into a flamegraph "folded" stack (root first, ';' separated)"""
+    frames = traceback.extract_stack(frame, limit=limit)
+    return ";".join(f"{f.name} ({f.filename}:{f.lineno})" for f in frames)
+
+
+def format_folded(counts) -> str:
+    """Renders {folded_stack: weight} as flamegraph.pl / speedscope input"""
+    return "\n".join(
+        f"{stack} {int(weight)}" for stack, weight in counts.items() if weight
+    ) + "\n"
+
+
+class SlowCallbackWatchdog:
+    """Detects callbacks that hold the event loop and captures their stacks
+
+    A coroutine on the loop refreshes a heartbeat; a background thread checks it
+    and, once it goes stale, snapshots what the loop thread is executing.
+    """
+
+    def __init__(self, threshold: float = 0.25, max_reports: int = 200):
+        self.threshold = threshold
+        self.interval = threshold / 4
+        self.heartbeat = time.monotonic()
+        self.stalls = Counter()
+        self.recent = deque(maxlen=max_reports)
+        self.loop_thread_id = None
+        self._thread = None
+
+    async def run(self):
+        """Refresh the heartbeat forever (run as a background task)"""
+        self.loop_thread_id = threading.get_ident()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._thread.start()
+        while True:
+            self.heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported = None
+        while True:
+            time.sleep(self.interval)
+            beat = self.heartbeat
+            stalled_for = time.monotonic() - beat
+            # Report each stall once, while the offending code is still running
+            if stalled_for < self.threshold or reported == beat:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            reported = beat
+            stack = fold_stack(frame)
+            self.stalls[stack] += 1
+            self.recent.append(
+                {"at": time.time(), "stalled_ms": round(stalled_for * 1000), "stack": stack}
+            )
+            print(f"[SLOW CALLBACK] loop blocked for {stalled_for * 1000:.0f} ms")
+            print("".join(traceback.format_stack(frame)))
+
+    def folded(self) -> str:
+        return format_folded(self.stalls)
+
+
+class SamplingProfiler:
+    """Low-overhead wall-clock sampler over all threads, started on demand"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = Counter()
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float = None):
+        if interval is not None and not interval > 0:
+            raise ValueError("interval must be positive")
+        if self.running:
+            return False
+        if interval:
+            self.interval = max(interval, MIN_SAMPLE_INTERVAL)
+        self.samples = Counter()
+        self.started_at = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sample, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self) -> str:
+        """Stops sampling and returns the folded stacks collected"""
+        if not self.running:
+            return ""
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return format_folded(self.samples)
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                thread_name = names.get(thread_id, str(thread_id))
+                self.samples[f"{thread_name};{fold_stack(frame)}"] += 1
+
+
+class TaskStats:
+    """Timing of one per-session task: wall time and time spent holding the loop"""
+
+    def __init__(self, session_id: str, name: str):
+        self.session_id = session_id
+        self.name = name
+        self.started = time.monotonic()
+        self.finished = None
+        self.busy = 0.0
+        self.steps = 0
+        self.max_step = 0.0
+
+    def as_dict(self):
+        end = self.finished or time.monotonic()
+        return {
+            "session_id": self.session_id,
+            "task": self.name,
+            "wall_ms": round((end - self.started) * 1000, 1),
+            "busy_ms": round(self.busy * 1000, 1),
+            "steps": self.steps,
+            "max_step_ms": round(self.max_step * 1000, 1),
+            "running": self.finished is None,
+        }
+
+
+@types.coroutine
+def _drive(coro, stats: TaskStats):
+    """Runs coro step by step, timing each step it holds the event loop for"""
+    value, error = None, None
+    while True:
+        start = time.perf_counter()
+        try:
+            if error is not None:
+                yielded = coro.throw(error)
+            else:
+                yielded = coro.send(value)
+        except StopIteration as e:
+            return e.value
+        finally:
+            step = time.perf_counter() - start
+            stats.busy += step
+            stats.steps += 1
+            stats.max_step = max(stats.max_step, step)
+        try:
+            value, error = (yield yielded), None
+        except BaseException as e:
+            value, error = None, e
+
+
+class TaskTimer:
+    """Registry of per-session task timings"""
+
+    def __init__(self, keep: int = 500):
+        self.live = {}
+        self.done = deque(maxlen=keep)
+
+    async def timed(self, session_id: str, name: str, coro):
+        """Awaits coro while recording its TaskStats"""
+        stats = TaskStats(session_id, name)
+        self.live[id(stats)] = stats
+        try:
+            return await _drive(coro, stats)
+        finally:
+            stats.finished = time.monotonic()
+            self.live.pop(id(stats), None)
+            self.done.append(stats)
+            print(
+                f"[TASK TIMING] {session_id} {name}: "
+                f"busy {stats.busy * 1000:.1f} ms over {stats.steps} steps, "
+                f"max step {stats.max_step * 1000:.1f} ms"
+            )
+
+    def snapshot(self):
+        return [s.as_dict() for s in list(self.done) + list(self.live.values())]
+
+    def folded(self) -> str:
+        """Busy time per session/task in microseconds, as folded stacks"""
+        counts = Counter()
+        for s in list(self.done) + list(self.live.values()):
+            counts[f"session {s.session_id};{s.name}"] += s.busy * 1_000_000
+        return format_folded(counts)
@@ -0,0 +1,436 @@
+// Use secure WebSocket (wss://) if the page is loaded over HTTPS, otherwise use ws://
+const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+// API key for instances with tenants configured, and the agent profile,
+// taken from ?api_key= and ?agent= on the page
+const pageParams = new URLSearchParams(window.location.search);
+const apiKey = pageParams.get("api_key");
+const agentProfile = pageParams.get("agent");
+let ws = null;
+
+// Highest frame sequence number received, sent back when reconnecting
+// so the server replays only what we missed
+let lastSeq = 0;
+// Given by the server with a new session; needed to resume it
+let resumeToken = sessionStorage.getItem("resumeToken");
+let reconnectAttempts = 0;
+
+// Connect to the server with a WebSocket connection. The session is kept
+// for the tab's lifetime, so a page reload resumes it rather than holding
+// a second session (and tenant slot) until the first one expires
+let sessionId = sessionStorage.getItem("sessionId");
+if (!sessionId) {
+    startNewSession();
+}
+
+function startNewSession() {
+    sessionId = Math.random().toString(36).substring(2, 15);
+    resumeToken = null;
+    lastSeq = 0;
+    sessionStorage.setItem("sessionId", sessionId);
+    sessionStorage.removeItem("resumeToken");
+}
+
+// Get DOM elements
+const messageForm = document.getElementById("messageForm");
+const messageInput = document.getElementById("message");
+const sendButton = document.getElementById("sendButton");
+const stopButton = document.getElementById("stopButton");
+const messagesDiv = document.getElementById("messages");
+
+// Current response being built
+let currentResponse = "";
+let responseDiv = null;
+let sourcesDiv = null;
+
+// An answer is streaming / we asked the server to cancel it
+let answering = false;
+let cancelling = false;
+// After a resume: once frames up to this seq are in without the cancel
+// being acknowledged, the cancel was lost with the old socket
+let resendCancelAt = null;
+
+// Enable the send button when connection is established
+function handleOpen(event) {
+    sendButton.disabled = false;
+    reconnectAttempts = 0;
+    // Without a resume handshake this is a new session: nothing to cancel
+    if (!resumeToken) {
+        cancelling = false;
+    }
+    console.log("Connection established");
+}
+
+// Process text to detect and format lists
+function formatResponse(text) {
+    // Format bold text (**text**)
+    text = text.replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>');
+
+    // Format italic text (*text*)
+    text = text.replace(/\*([^\*]+)\*/g, '<em>$1</em>');
+
+    // Look for numbered list patterns
+    if (text.includes("\n1.") || text.includes("\n1)") || text.includes(" 1.") || text.includes(" 1)")) {
+        // Convert numbered list patterns to HTML
+        text = text.replace(/(?:\n|^)(\d+)[.)] (.*?)(?=(?:\n\d+[.)])|$)/gs, function(match, number, content) {
+            // Check if content has a title/header pattern (e.g., "Title: Details")
+            const titleMatch = content.match(/^(.*?): (.*)/);
+            if (titleMatch) {
+                return `<div class="list-item">
+                    <div class="list-item-header">${number}. ${titleMatch[1]}</div>
+                    <div class="list-item-content">${titleMatch[2]}</div>
+                </div>`;
+            } else {
+                return `<div class="list-item">${number}. ${content}</div>`;
+            }
+        });
+    }
+
+    // Process multi-level bullet lists
+    // First, identify all bullet points and their indentation levels
+    const lines = text.split('\n');
+    let inList = false;
+    let listHTML = '';
+    let listStack = [];
+
+    for (let i = 0; i < lines.length; i++) {
+        const line = lines[i];
+        // Check if line is a bullet point
+        const bulletMatch = line.match(/^(\s*)[-*+] (.*)/);
+
+        if (bulletMatch) {
+            const indentation = bulletMatch[1].length;
+            const content = bulletMatch[2];
+
+            // If not in a list yet, start a new list
+            if (!inList) {
+                listHTML += '<ul>';
+                listStack.push('ul');
+                inList = true;
+            }
+
+            // Determine the current level based on indentation
+            const currentLevel = Math.floor(indentation / 2) + 1;
+            const stackLevel = listStack.length;
+
+            // If we need to go deeper in nesting
+            if (currentLevel > stackLevel) {
+                for (let j = stackLevel; j < currentLevel; j++) {
+                    listHTML += '<ul>';
+                    listStack.push('ul');
+                }
+            }
+            // If we need to go up in the nesting hierarchy
+            else if (currentLevel < stackLevel) {
+                for (let j = stackLevel; j > currentLevel; j--) {
+                    listHTML += '</li></ul>';
+                    listStack.pop();
+                }
+                listHTML += '</li>';
+            } 
+            // Same level, just close the previous item if needed
+            else if (i > 0 && lines[i-1].match(/^(\s*)[-*+] (.*)/)) {
+                listHTML += '</li>';
+            }
+
+            // Add the list item
+            listHTML += '<li>' + content;
+        } else {
+            // If we're in a list but this line isn't a bullet point
+            if (inList) {
+                // If the line isn't empty, it's part of the previous item
+                if (line.trim() !== '') {
+                    listHTML += ' ' + line;
+                } 
+                // Empty line means end of list
+                else {
+                    // Close all open lists
+                    while (listStack.length > 0) {
+                        listHTML += '</li></ul>';
+                        listStack.pop();
+                    }
+                    inList = false;
+                    // Replace the original bullet list in text
+                    text = text.replace(/^(\s*)[-*+] (.*\n)+/m, listHTML);
+                    listHTML = '';
+                }
+            }
+        }
+    }
+
+    // If we're still in a list at the end of processing, close it
+    if (inList) {
+        // Close the last item
+        listHTML += '</li>';
+        // Close all open lists
+        while (listStack.length > 0) {
+            listHTML += '</ul>';
+            listStack.pop();
+        }
+        // Replace the original bullet list in text
+        text = text.replace(/^(\s*)[-*+] (.*\n?)+/m, listHTML);
+    }
+
+    // Handle simple bullet lists (as a fallback)
+    text = text.replace(/(?:\n|^)[*-] (.*?)(?=(?:\n[*-])|$)/gs, '<li>$1</li>');
+    if (text.includes('<li>') && !text.includes('<ul>')) {
+        text = '<ul>' + text + '</ul>';
+    }
+
+    // Handle paragraphs
+    text = text.replace(/\n\n/g, '</p><p>');
+
+    return text;
+}
+
+// Apply final formatting and get ready for the next answer
+function finishResponse(traceId) {
+    if (responseDiv) {
+        responseDiv.innerHTML = formatResponse(responseDiv.innerHTML);
+        if (traceId) {
+            responseDiv.dataset.traceId = traceId;
+        }
+    }
+    currentResponse = "";
+    responseDiv = null;
+    sourcesDiv = null;
+    answering = false;
+    stopButton.disabled = true;
+}
+
+// Stop the answer being streamed (the server stops generating it too)
+function cancelAnswer() {
+    if (!answering) {
+        return;
+    }
+    // A closed socket drops it: it is sent again after the resume
+    if (ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify({type: "cancel"}));
+    }
+    cancelling = true;
+    if (responseDiv) {
+        responseDiv.innerHTML += "<br><i>[Cancelled]</i>";
+    }
+    finishResponse(null);
+}
+
+stopButton.addEventListener("click", cancelAnswer);
+
+function resendCancelIfLost() {
+    if (cancelling && resendCancelAt !== null && lastSeq >= resendCancelAt) {
+        resendCancelAt = null;
+        ws.send(JSON.stringify({type: "cancel"}));
+    }
+}
+
+// Handle messages from the server
+function handleMessage(event) {
+    const data = JSON.parse(event.data);
+
+    // First frame of a new session
+    if (data.resume_token) {
+        resumeToken = data.resume_token;
+        sessionStorage.setItem("resumeToken", resumeToken);
+        return;
+    }
+
+    // Answer to the resume handshake after a reconnect
+    if (data.resumed !== undefined) {
+        if (data.resumed) {
+            // The ack may be in the replay; if it isn't, cancel again
+            if (cancelling) {
+                resendCancelAt = data.latest;
+                resendCancelIfLost();
+            }
+        } else {
+            // What we missed is gone: give up on the partial answer
+            lastSeq = data.seq;
+            cancelling = false;
+            resendCancelAt = null;
+            if (answering) {
+                if (responseDiv) {
+                    responseDiv.innerHTML += "<br><i>[Connection lost]</i>";
+                }
+                finishResponse(null);
+            }
+        }
+        return;
+    }
+
+    // Skip frames we already have
+    if (data.seq !== undefined) {
+        if (data.seq <= lastSeq) {
+            return;
+        }
+        lastSeq = data.seq;
+    }
+
+    // The server confirmed the cancel: frames after this are a new answer
+    if (data.cancelled) {
+        cancelling = false;
+        resendCancelAt = null;
+        return;
+    }
+    resendCancelIfLost();
+
+    // Drop what was still in flight for the cancelled answer
+    if (cancelling) {
+        return;
+    }
+
+    // Refused by the server (bad API key, rate limit or quota)
+    if (data.error) {
+        console.log("Server error:", data.code, data.error);
+        const errorDiv = document.createElement("div");
+        errorDiv.className = "message agent";
+        // Error texts can quote the client's own input: never parse them as HTML
+        const errorText = document.createElement("i");
+        errorText.textContent = "[" + data.error + "]";
+        errorDiv.appendChild(errorText);
+        messagesDiv.appendChild(errorDiv);
+        if (answering) {
+            finishResponse(null);
+        }
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        return;
+    }
+
+    // If it's a turn complete message
+    if (data.turn_complete) {
+        if (data.trace_id) {
+            console.log("Turn trace id:", data.trace_id);
+        }
+
+        // Apply final formatting (keeping the server trace id so a
+        // slow answer can be looked up) and reset for next message
+        finishResponse(data.trace_id);
+
+        // Scroll to bottom
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        return;
+    }
+
+    // If it's an interrupted message
+    if (data.interrupted) {
+        if (responseDiv) {
+            responseDiv.innerHTML += "<br><i>[Conversation interrupted]</i>";
+        }
+        return;
+    }
+
+    // If it's a search source behind the answer
+    if (data.citation) {
+        // Only link to web pages
+        if (!/^https?:\/\//.test(data.citation.uri)) {
+            return;
+        }
+        if (!sourcesDiv) {
+            sourcesDiv = document.createElement("div");
+            sourcesDiv.className = "sources";
+            sourcesDiv.textContent = "Sources: ";
+            messagesDiv.appendChild(sourcesDiv);
+        }
+        const link = document.createElement("a");
+        link.href = data.citation.uri;
+        link.target = "_blank";
+        link.rel = "noopener noreferrer";
+        link.textContent = "[" + data.citation.index + "] " + data.citation.title;
+        sourcesDiv.appendChild(link);
+        return;
+    }
+
+    // If it's a regular message chunk
+    if (data.message) {
+        // If this is the first chunk, create a new response div
+        if (!responseDiv) {
+            responseDiv = document.createElement("div");
+            responseDiv.className = "message agent";
+            // Keep sources that arrived first below the answer
+            messagesDiv.insertBefore(responseDiv, sourcesDiv);
+        }
+
+        // Add to the response div
+        responseDiv.innerHTML += data.message;
+
+        // Scroll to bottom
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    }
+}
+
+// Handle form submission
+messageForm.addEventListener("submit", function(event) {
+    event.preventDefault();
+
+    const message = messageInput.value.trim();
+    if (message) {
+        // Display user message
+        const userDiv = document.createElement("div");
+        userDiv.className = "message user";
+        userDiv.textContent = message;
+        messagesDiv.appendChild(userDiv);
+
+        // A new question replaces the answer still streaming
+        cancelAnswer();
+
+        // Send message to server
+        ws.send(JSON.stringify({type: "message", text: message}));
+        answering = true;
+        stopButton.disabled = false;
+
+        // Clear input field
+        messageInput.value = "";
+
+        // Scroll to bottom
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    }
+});
+
+// Handle WebSocket closure
+function handleClose(event) {
+    console.log("Connection closed");
+    sendButton.disabled = true;
+
+    // A bad API key or agent name won't get better by retrying, and a
+    // session taken over by another socket isn't ours to retake
+    if (event.code === 4401 || event.code === 4404 || event.code === 4409) {
+        return;
+    }
+
+    // Our stored session can't be resumed (e.g. its token is stale): start over
+    if (event.code === 4403) {
+        startNewSession();
+        connect();
+        return;
+    }
+
+    // Exponential backoff with full jitter (0.5s doubling up to 30s),
+    // so a server restart doesn't bring every client back at once
+    const ceiling = Math.min(30000, 500 * Math.pow(2, reconnectAttempts));
+    const delay = Math.random() * ceiling;
+    reconnectAttempts++;
+    console.log("Attempting to reconnect in " + Math.round(delay) + " ms...");
+    setTimeout(connect, delay);
+}
+
+function connect() {
+    const params = new URLSearchParams();
+    if (apiKey) {
+        params.set("api_key", apiKey);
+    }
+    if (agentProfile) {
+        params.set("agent", agentProfile);
+    }
+    if (resumeToken) {
+        params.set("resume_token", resumeToken);
+        params.set("last_seq", lastSeq);
+    }
+    const query = params.toString();
+    const ws_url = protocol + "//" + window.location.host + "/ws/" + sessionId;
+    const url = query ? ws_url + "?" + query : ws_url;
+    console.log("Connecting to WebSocket at: ", url);
+    ws = new WebSocket(url);
+    ws.onopen = handleOpen;
+    ws.onmessage = handleMessage;
+    ws.onclose = handleClose;
+}
+
+connect();
@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import asyncio
+import tomllib
+from datetime import datetime, timezone
+
+# Close codes sent to websocket clients that are refused
+UNAUTHORIZED = 4401
+OVER_QUOTA = 4429
+
+
+class TenantError(Exception):
+    """A connection or message refused for a tenant"""
+
+    def __init__(self, message: str, code: str, close_code: int = OVER_QUOTA):
+        super().__init__(message)
+        self.code = code
+        self.close_code = close_code
+
+
+class Tenant:
+    """An API key holder and its limits (None = unlimited)"""
+
+    def __init__(self, name: str, keys=(), max_sessions: int = None,
+                 requests_per_minute: float = None, tokens_per_day: int = None):
+        self.name = name
+        self.keys = set(keys)
+        self.max_sessions = max_sessions
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_day = tokens_per_day
+        self.active_sessions = 0
+        # Token bucket for the request rate, refilled continuously
+        self.allowance = float(requests_per_minute or 0)
+        self.refilled_at = time.monotonic()
+
+    def take_request(self) -> bool:
+        if not self.requests_per_minute:
+            return True
+        now = time.monotonic()
+        self.allowance = min(
+            float(self.requests_per_minute),
+            self.allowance + (now - self.refilled_at) * self.requests_per_minute / 60,
+        )
+        self.refilled_at = now
+        if self.allowance < 1:
+            return False
+        self.allowance -= 1
+        return True
+
+    def update(self, other: "Tenant"):
+        """Takes the keys and limits of other, keeping sessions and the bucket"""
+        if not self.requests_per_minute:
+            # Unlimited until now: the bucket was never used, start it full
+            self.allowance = float(other.requests_per_minute or 0)
+            self.refilled_at = time.monotonic()
+        else:
+            self.allowance = min(self.allowance, float(other.requests_per_minute or 0))
+        self.keys = other.keys
+        self.max_sessions = other.max_sessions
+        self.requests_per_minute = other.requests_per_minute
+        self.tokens_per_day = other.tokens_per_day
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def empty_usage() -> dict:
+    return {"requests": 0, "prompt_tokens": 0, "response_tokens": 0, "tokens": 0, "rejected": 0}
+
+
+class TenantRegistry:
+    """Authenticates clients and meters their usage against quotas
+
+    Tenants come from a TOML file:
+
+        [tenants.acme]
+        keys = ["secret-key"]
+        max_sessions = 20
+        requests_per_minute = 60
+        tokens_per_day = 500000
+
+    Without a file, authentication is off and everyone is the unlimited
+    "default" tenant (usage is still counted). Counters are kept per UTC day
+    and flushed to usage_path, so a restart doesn't reset daily quotas.
+    """
+
+    def __init__(self, path: str = None, usage_path: str = None):
+        self.path = path
+        self.usage_path = usage_path
+        self.tenants = {}
+        self.by_key = {}
+        self.day = today()
+        self.usage = {}
+        self.totals = {}
+        self.dirty = False
+        if path:
+            self.load(path)
+        if usage_path:
+            self.load_usage(usage_path)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def load(self, path: str):
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+        # Built first, so a bad file leaves the current tenants untouched
+        loaded = {name: Tenant(name, **options) for name, options in config.get("tenants", {}).items()}
+        tenants = {}
+        for name, tenant in loaded.items():
+            # Live sessions hold the existing object: it is updated in place
+            previous = self.tenants.get(name)
+            if previous is not None:
+                previous.update(tenant)
+                tenant = previous
+            tenants[name] = tenant
+        self.tenants = tenants
+        self.by_key = {key: tenant for tenant in tenants.values() for key in tenant.keys}
+
+    def load_usage(self, path: str):
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.totals = saved.get("totals", {})
+        if saved.get("day") == self.day:
+            self.usage = saved.get("usage", {})
+
+    def authenticate(self, api_key: str = None) -> Tenant:
+        if not self.enabled:
+            return self.tenants.setdefault("default", Tenant("default"))
+        tenant = self.by_key.get(api_key) if api_key else None
+        if tenant is None:
+            raise TenantError("Invalid or missing API key", "unauthorized", UNAUTHORIZED)
+        return tenant
+
+    def _roll_day(self):
+        if today() != self.day:
+            self.day = today()
+            self.usage = {}
+
+    def _counters(self, tenant: Tenant):
+        self._roll_day()
+        return (
+            self.usage.setdefault(tenant.name, empty_usage()),
+            self.totals.setdefault(tenant.name, empty_usage()),
+        )
+
+    def _reject(self, tenant: Tenant, message: str, code: str):
+        for counters in self._counters(tenant):
+            counters["rejected"] += 1
+        self.dirty = True
+        print(f"[QUOTA] {tenant.name}: {message}")
+        raise TenantError(message, code)
+
+    def _check_tokens(self, tenant: Tenant):
+        day, _ = self._counters(tenant)
+        if tenant.tokens_per_day is not None and day["tokens"] >= tenant.tokens_per_day:
+            self._reject(tenant, "Daily token quota exhausted", "quota_exceeded")
+
+    def admit(self, tenant: Tenant):
+        """Takes a session slot for the tenant or raises TenantError"""
+        if tenant.max_sessions is not None and tenant.active_sessions >= tenant.max_sessions:
+            self._reject(tenant, f"Too many sessions (limit {tenant.max_sessions})", "too_many_sessions")
+        self._check_tokens(tenant)
+        tenant.active_sessions += 1
+
+    def release(self, tenant: Tenant):
+        tenant.active_sessions = max(0, tenant.active_sessions - 1)
+
+    def check_turn(self, tenant: Tenant):
+        """Counts a user message, raising TenantError if it is over the limits"""
+        self._check_tokens(tenant)
+        if not tenant.take_request():
+            self._reject(tenant, f"Rate limit exceeded ({tenant.requests_per_minute}/min)", "rate_limited")
+        for counters in self._counters(tenant):
+            counters["requests"] += 1
+        self.dirty = True
+
+    def record_tokens(self, tenant: Tenant, prompt: int, response: int):
+        for counters in self._counters(tenant):
+            counters["prompt_tokens"] += prompt
+            counters["response_tokens"] += response
+            counters["tokens"] += prompt + response
+        self.dirty = True
+
+    def snapshot(self) -> dict:
+        self._roll_day()
+        return {
+            "auth": self.enabled,
+            "day": self.day,
+            "tenants": {
+                name: {
+                    "active_sessions": tenant.active_sessions,
+                    "max_sessions": tenant.max_sessions,
+                    "requests_per_minute": tenant.requests_per_minute,
+                    "tokens_per_day": tenant.tokens_per_day,
+                    "today": self.usage.get(name, empty_usage()),
+                    "total": self.totals.get(name, empty_usage()),
+                }
+                for name, tenant in self.tenants.items()
+            },
+        }
+
+    def flush(self):
+        """Writes the counters to usage_path (atomically) if they changed"""
+        if not self.usage_path or not self.dirty:
+            return
+        self.dirty = False
+        data = {"day": self.day, "usage": self.usage, "totals": self.totals}
+        tmp = f"{self.usage_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.usage_path)
+
+    async def run_flusher(self, interval: float = 30):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except OSError as e:
+                self.dirty = True
+                print(f"[USAGE FLUSH ERROR]: {str(e)}")
+
+
+class TurnMeter:
+    """Counts the tokens of a conversation's turns for its tenant
+
+    Uses the model's usage metadata when the live stream reports it, and
+    otherwise estimates ~4 characters per token of prompt and answer text.
+    """
+
+    def __init__(self, registry: TenantRegistry, tenant: Tenant):
+        self.registry = registry
+        self.tenant = tenant
+        self.reset()
+
+    def reset(self):
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens = None
+        self.response_tokens = None
+        self.open = False
+
+    def message_sent(self, text: str):
+        self.open = True
+        self.prompt_chars += len(text)
+
+    def on_event(self, event):
+        usage = getattr(event, "usage_metadata", None)
+        if usage is None:
+            return
+        # Counts are per turn so far: keep the largest seen
+        self.prompt_tokens = max(self.prompt_tokens or 0, usage.prompt_token_count or 0)
+        self.response_tokens = max(self.response_tokens or 0, usage.candidates_token_count or 0)
+
+    def text_sent(self, text: str):
+        self.response_chars += len(text)
+
+    def complete(self):
+        """Bills the turn (complete, cancelled or cut off) to the tenant"""
+        if not self.open:
+            return
+        prompt = self.prompt_tokens if self.prompt_tokens is not None else self.prompt_chars // 4
+        response = self.response_tokens if self.response_tokens is not None else self.response_chars // 4
+        self.registry.record_tokens(self.tenant, prompt, response)
+        self.reset()
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+from collections import deque
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+def _attributes(attrs: dict):
+    """Converts a plain dict to OTLP/JSON attributes"""
+    result = []
+    for key, value in attrs.items():
+        if isinstance(value, bool):
+            result.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            result.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            result.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            result.append({"key": key, "value": {"stringValue": str(value)}})
+    return result
+
+
+def _ms(start_ns, end_ns):
+    if start_ns is None or end_ns is None:
+        return None
+    return round((end_ns - start_ns) / 1e6, 1)
+
+
+class Turn:
+    """One user message and the agent's response to it"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.trace_id = _new_id(16)
+        self.root_span_id = _new_id(8)
+        self.marks = {"message_received": time.time_ns()}
+        self.spans = []
+        self.open_tools = {}
+        self.tool_ns = 0
+        self.chunks = 0
+        self.chars = 0
+        self.discarded = 0
+        self.status = None
+
+    def mark(self, name: str):
+        """Records the first time name happened in this turn"""
+        if name not in self.marks:
+            self.marks[name] = time.time_ns()
+
+    def add_span(self, name: str, start_ns: int, end_ns: int, **attrs):
+        if start_ns is None or end_ns is None:
+            return
+        self.spans.append({
+            "traceId": self.trace_id,
+            "spanId": _new_id(8),
+            "parentSpanId": self.root_span_id,
+            "name": name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": _attributes(attrs),
+        })
+
+    def tool_start(self, call_id: str, name: str):
+        self.mark("first_tool_call")
+        self.open_tools[call_id] = (name, time.time_ns())
+
+    def tool_end(self, call_id: str):
+        name, start = self.open_tools.pop(call_id, (None, None))
+        if start is None:
+            return
+        end = time.time_ns()
+        self.tool_ns += end - start
+        self.add_span(f"tool_call {name}", start, end, **{"tool.name": name})
+
+    def finish(self, status: str):
+        """Closes the turn and builds its child spans"""
+        self.status = status
+        self.mark("turn_complete")
+        m = self.marks
+        for call_id in list(self.open_tools):
+            self.tool_end(call_id)
+        self.add_span("enqueue", m["message_received"], m.get("enqueued"))
+        self.add_span("wait_first_event", m.get("enqueued"), m.get("first_event"))
+        self.add_span("time_to_first_token", m["message_received"], m.get("first_text"))
+        self.add_span("stream", m.get("first_text"), m["turn_complete"], chunks=self.chunks)
+
+    def root_span(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.root_span_id,
+            "name": "turn",
+            "kind": 2,
+            "startTimeUnixNano": str(self.marks["message_received"]),
+            "endTimeUnixNano": str(self.marks["turn_complete"]),
+            "attributes": _attributes({
+                "session.id": self.session_id,
+                "turn.status": self.status,
+                "turn.chunks": self.chunks,
+                "turn.grounded": "grounding" in self.marks,
+            }),
+        }
+
+    def summary(self):
+        """Per-turn latency breakdown in milliseconds"""
+        m = self.marks
+        received = m["message_received"]
+        return {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "total_ms": _ms(received, m.get("turn_complete")),
+            "enqueue_ms": _ms(received, m.get("enqueued")),
+            "first_event_ms": _ms(received, m.get("first_event")),
+            "ttft_ms": _ms(received, m.get("first_text")),
+            "tool_ms": round(self.tool_ns / 1e6, 1),
+            "stream_ms": _ms(m.get("first_text"), m.get("turn_complete")),
+            "chunks": self.chunks,
+            "chars": self.chars,
+        }
+
+
+class TraceExporter:
+    """Writes finished turns as OTLP/JSON lines and keeps recent summaries"""
+
+    def __init__(self, path: str = None, service_name: str = "search-agent", keep: int = 1000):
+        self.path = path
+        self.service_name = service_name
+        self.recent = deque(maxlen=keep)
+        self._file = None
+        # Cancellation accounting; answers are ~4 characters per token
+        self.completed_turns = 0
+        self.completed_chars = 0
+        self.cancellations = 0
+        self.discarded_frames = 0
+        self.tokens_saved = 0.0
+
+    def account(self, turn: Turn):
+        """Estimates what a cancelled turn saved against an average full answer"""
+        if turn.status == "complete":
+            self.completed_turns += 1
+            self.completed_chars += turn.chars
+        elif turn.status == "cancelled":
+            self.cancellations += 1
+            self.discarded_frames += turn.discarded
+            if self.completed_turns:
+                average = self.completed_chars / self.completed_turns
+                self.tokens_saved += max(0.0, average - turn.chars) / 4
+
+    def cancellation_report(self):
+        return {
+            "cancelled_turns": self.cancellations,
+            "discarded_frames": self.discarded_frames,
+            "estimated_tokens_saved": round(self.tokens_saved),
+        }
+
+    def export(self, turn: Turn):
+        summary = turn.summary()
+        self.recent.append(summary)
+        self.account(turn)
+        print(
+            f"[TURN LATENCY] {summary['trace_id']} {summary['status']}: "
+            f"ttft {summary['ttft_ms']} ms, tool {summary['tool_ms']} ms, "
+            f"stream {summary['stream_ms']} ms, total {summary['total_ms']} ms"
+        )
+        if not self.path:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", buffering=1)
+        record = {
+            "resourceSpans": [{
+                "resource": {"attributes": _attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "app.tracing"},
+                    "spans": [turn.root_span()] + turn.spans,
+                }],
+            }]
+        }
+        self._file.write(json.dumps(record) + "\n")
+
+    def report(self):
+        """Recent turn summaries plus p50/p95 of each latency component"""
+        turns = list(self.recent)
+        stats = {}
+        for key in ("ttft_ms", "first_event_ms", "tool_ms", "stream_ms", "total_ms"):
+            values = sorted(t[key] for t in turns if t[key] is not None)
+            if values:
+                stats[key] = {
+                    "p50": values[len(values) // 2],
+                    "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                }
+        return {
+            "turns": len(turns),
+            "latency": stats,
+            "cancellation": self.cancellation_report(),
+            "recent": turns[-50:],
+        }
+
+
+class TurnTracer:
+    """Follows the turns of one live session"""
+
+    def __init__(self, session_id: str, exporter: TraceExporter):
+        self.session_id = session_id
+        self.exporter = exporter
+        self.current = None
+
+    def message_received(self) -> Turn:
+        # A new message while a turn is open means the old answer is abandoned
+        if self.current is not None:
+            self.complete("superseded")
+        self.current = Turn(self.session_id)
+        return self.current
+
+    def mark(self, name: str):
+        if self.current is not None:
+            self.current.mark(name)
+
+    def on_event(self, event):
+        """Records the timing-relevant parts of an ADK event"""
+        turn = self.current
+        if turn is None:
+            return
+        turn.mark("first_event")
+        for call in event.get_function_calls():
+            turn.tool_start(call.id or call.name, call.name)
+        for response in event.get_function_responses():
+            turn.tool_end(response.id or response.name)
+        if getattr(event, "grounding_metadata", None) is not None:
+            turn.mark("grounding")
+
+    def text_sent(self, text: str = ""):
+        if self.current is not None:
+            self.current.mark("first_text")
+            self.current.chunks += 1
+            self.current.chars += len(text)
+
+    def complete(self, status: str = None, discarded: int = 0):
+        """Finishes the open turn, returns its trace id"""
+        turn, self.current = self.current, None
+        if turn is None:
+            return None
+        turn.discarded = discarded
+        if status is None:
+            status = "interrupted" if "interrupted" in turn.marks else "complete"
+        turn.finish(status)
+        self.exporter.export(turn)
+        return turn.trace_id
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Citation Streaming Benchmark
+
+Feeds synthetic multi-part ADK events (text split over several parts, with
+google_search grounding metadata on some of them) through the server's
+agent_to_client_messaging and measures throughput and how long text frames
+wait behind event processing. Compares against the old behaviour of only
+forwarding the first part's text.
+
+Usage:
+    python scripts/bench_citations.py [--events 20000] [--parts 4] [--sources 8]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from google.adk.events import Event
+from google.genai import types
+
+from app.main import agent_to_client_messaging
+from app.citations import CitationTracker
+from app.tracing import TraceExporter, TurnTracer
+
+
+def make_events(count, parts, sources, grounded_every=10):
+    """Builds partial text events, every Nth one grounded, ending with turn_complete"""
+    events = []
+    for i in range(count):
+        metadata = None
+        if i % grounded_every == grounded_every - 1:
+            # Sources repeat across events, as they do over a long answer
+            metadata = types.GroundingMetadata(grounding_chunks=[
+                types.GroundingChunk(web=types.GroundingChunkWeb(
+                    uri=f"https://example.com/source/{(i + s) % (sources * 4)}",
+                    title=f"Source {(i + s) % (sources * 4)}",
+                ))
+                for s in range(sources)
+            ])
+        events.append(Event(
+            author="basic_search_agent",
+            partial=True,
+            content=types.Content(role="model", parts=[
+                types.Part(text=f"chunk {i} part {p} ") for p in range(parts)
+            ]),
+            grounding_metadata=metadata,
+        ))
+    events.append(Event(author="basic_search_agent", turn_complete=True))
+    return events
+
+
+async def first_part_only(send, live_events):
+    """The previous behaviour: only the first part's text was forwarded"""
+    async for event in live_events:
+        part = event.content and event.content.parts and event.content.parts[0]
+        if not part or not event.partial or not part.text:
+            continue
+        await send({"message": part.text})
+
+
+async def measure(name, handler, events):
+    frames = {"message": 0, "citation": 0, "other": 0}
+    waits = []
+    received_at = {}
+
+    async def send(frame):
+        kind = next((k for k in ("message", "citation") if k in frame), "other")
+        frames[kind] += 1
+        if kind == "message":
+            waits.append(time.perf_counter() - received_at["t"])
+
+    async def live_events():
+        for event in events:
+            received_at["t"] = time.perf_counter()
+            yield event
+
+    # Silence the per-frame logging of the server code while measuring
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        await handler(send, live_events())
+        elapsed = time.perf_counter() - start
+    waits.sort()
+    p99 = waits[int(len(waits) * 0.99)] * 1e6 if waits else 0
+    print(f"{name:24} {len(events) / elapsed:>10,.0f} events/s  "
+          f"text frames {frames['message']:>6}  citations {frames['citation']:>4}  "
+          f"text wait p50 {waits[len(waits) // 2] * 1e6 if waits else 0:.1f} us, p99 {p99:.1f} us")
+
+
+async def main(args):
+    events = make_events(args.events, args.parts, args.sources)
+    print(f"{args.events} events, {args.parts} parts each, {args.sources} sources per grounded event\n")
+
+    async def current(send, live):
+        tracer = TurnTracer("bench", TraceExporter())
+        tracer.message_received()
+        await agent_to_client_messaging(send, live, tracer, CitationTracker())
+
+    for _ in range(args.repeat):
+        await measure("first part only (old)", first_part_only, events)
+        await measure("all parts + citations", current, events)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark citation streaming')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--parts', type=int, default=4)
+    parser.add_argument('--sources', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
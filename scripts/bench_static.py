@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Static Serving Benchmark
+
+Measures requests/sec on `/`. By default the ASGI apps are called in
+process (no sockets), which isolates the event loop time each request costs
+a streaming worker: the previous FileResponse(index.html) handler against
+the in-memory, precompressed assets, with and without a cached ETag.
+
+With --target, a running instance is measured over HTTP/1.1 keep-alive
+connections instead.
+
+Usage:
+    python scripts/bench_static.py [--requests 20000] [--concurrency 50]
+    python scripts/bench_static.py --target http://localhost:8010 --requests 20000
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import contextlib
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+
+
+def old_app(static_dir):
+    """The previous handler: the file is stat'ed and read on every request"""
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return FileResponse(os.path.join(static_dir, "index.html"))
+
+    return app
+
+
+async def call(app, headers):
+    """One GET / through the ASGI app, returns (status, body bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/", "raw_path": b"/",
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 8010),
+    }
+    status = None
+    size = 0
+    requested = False
+
+    async def receive():
+        # The request, then nothing until the response is done (as a live client)
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, size
+
+
+async def measure_app(name, app, headers, requests, concurrency):
+    status, size = await call(app, headers)
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await call(app, headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:36} {requests / elapsed:>10,.0f} req/s  "
+          f"{elapsed / requests * 1e6:>7.1f} us/req  status {status}, {size} bytes")
+
+
+async def http_worker(host, port, path, headers, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+        + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        + "\r\n"
+    ).encode()
+    try:
+        while counts["remaining"] > 0:
+            counts["remaining"] -= 1
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            counts["done"] += 1
+            counts["status"] = int(head.split(b" ")[1])
+            counts["bytes"] = length
+    finally:
+        writer.close()
+
+
+async def measure_http(name, target, headers, requests, concurrency):
+    url = urlparse(target)
+    counts = {"remaining": requests, "done": 0, "status": None, "bytes": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        http_worker(url.hostname, url.port or 80, url.path or "/", headers, counts)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    print(f"{name:36} {counts['done'] / elapsed:>10,.0f} req/s  "
+          f"status {counts['status']}, {counts['bytes']} bytes")
+
+
+async def main(args):
+    if args.target:
+        print(f"{args.requests} requests over {args.concurrency} connections to {args.target}\n")
+        await measure_http("identity", args.target, {}, args.requests, args.concurrency)
+        await measure_http("gzip, br", args.target, {"Accept-Encoding": "gzip, br"},
+                           args.requests, args.concurrency)
+        return
+
+    # Silence the startup logging of the server module
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        from app.main import app, static_assets, STATIC_DIR
+    index = static_assets.assets["index.html"]
+    etag = index.etags["br" if "br" in index.bodies else "gzip"]
+    compressed = [(b"accept-encoding", b"gzip, br")]
+    print(f"{args.requests} in-process requests, concurrency {args.concurrency}, "
+          f"assets from {static_assets.source}\n")
+    for _ in range(args.repeat):
+        await measure_app("FileResponse (old)", old_app(STATIC_DIR), [], args.requests, args.concurrency)
+        await measure_app("in memory, identity", app, [], args.requests, args.concurrency)
+        await measure_app("in memory, gzip/br", app, compressed, args.requests, args.concurrency)
+        await measure_app("in memory, If-None-Match (304)", app,
+                          compressed + [(b"if-none-match", etag.encode())],
+                          args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark serving of /')
+    parser.add_argument('--target', help='Base URL of a running instance (default: in process)')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Static Asset Build
+
+Fingerprints the files in app/static (style.css -> style.<hash>.css, with
+index.html pointing at the new names) and precompresses them with gzip and,
+if the brotli package is installed, brotli. The output goes to
+app/static/build, which the server loads into memory at startup instead of
+compressing on boot.
+
+Usage:
+    python scripts/build_static.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.assets import write_build, brotli
+
+STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app', 'static'))
+
+
+if __name__ == "__main__":
+    build_dir = write_build(STATIC_DIR)
+    for name in sorted(os.listdir(build_dir)):
+        print(f"{os.path.getsize(os.path.join(build_dir, name)):>8}  {name}")
+    if brotli is None:
+        print("brotli is not installed: only gzip versions were written")
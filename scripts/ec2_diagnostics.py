@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+EC2 Diagnostics
+
+Runs the checks from ec2_quick_check.py and ec2_settings_checker.py
+concurrently. Each check has its own timeout and may depend on other checks
+(e.g. the nginx config is only read if nginx is installed); a check whose
+dependencies failed is reported as skipped. Only the standard library is
+used, so the script can be piped to a fresh instance over SSH.
+
+Usage:
+    python ec2_diagnostics.py                      # run locally
+    python ec2_diagnostics.py --json               # machine-readable output
+    python ec2_diagnostics.py --only port_8010,app_ready
+    python ec2_diagnostics.py --hosts ec2-user@1.2.3.4,ec2-user@5.6.7.8 --key ~/keys/key.pem
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import signal
+import argparse
+import platform
+
+# ANSI color codes for better readability
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RED = '\033[91m'
+BLUE = '\033[94m'
+BOLD = '\033[1m'
+END = '\033[0m'
+
+APP_PORT = 8010
+METADATA_URL = "169.254.169.254"
+
+# Statuses a dependent check can build on
+PASSING = ("OK", "INFO")
+
+
+class Check:
+    """A single diagnostic: an async function plus its scheduling constraints"""
+
+    def __init__(self, name, func, section, deps=(), timeout=5.0):
+        self.name = name
+        self.func = func
+        self.section = section
+        self.deps = tuple(deps)
+        self.timeout = timeout
+
+
+CHECKS = {}
+
+
+def check(name, section, deps=(), timeout=5.0):
+    """Registers an async check function returning (status, value)"""
+    def register(func):
+        CHECKS[name] = Check(name, func, section, deps, timeout)
+        return func
+    return register
+
+
+#
+# Async primitives
+#
+
+async def run_command(command):
+    """Run a shell command, returns (returncode, stdout)"""
+    proc = await asyncio.create_subprocess_shell(
+        command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    try:
+        stdout, _ = await proc.communicate()
+    except asyncio.CancelledError:
+        # Timed out: don't leave the command (or anything it started) running
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        raise
+    return proc.returncode, stdout.decode('utf-8', 'replace').strip()
+
+
+async def command_output(command):
+    return (await run_command(command))[1]
+
+
+async def port_open(host, port):
+    """True if a TCP connection to host:port succeeds"""
+    try:
+        _, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return False
+    writer.close()
+    return True
+
+
+async def http_get(host, port=80, path="/"):
+    """Minimal HTTP/1.0 GET, returns (status_code, body)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.0\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, body.decode('utf-8', 'replace')
+
+
+async def which(program):
+    return bool(await command_output(f"command -v {program}"))
+
+
+#
+# Checks
+#
+
+@check("system", "System Information", timeout=3)
+async def check_system(results):
+    info = {
+        "os": platform.system(),
+        "release": platform.release(),
+        "hostname": platform.node(),
+    }
+    if os.path.exists('/etc/os-release'):
+        os_release = await command_output("cat /etc/os-release")
+        match = re.search(r'PRETTY_NAME="([^"]+)"', os_release)
+        if match:
+            info["distribution"] = match.group(1)
+    return "INFO", info
+
+
+@check("instance_metadata", "EC2 Instance", timeout=3)
+async def check_instance_metadata(results):
+    try:
+        status, instance_id = await http_get(METADATA_URL, 80, "/latest/meta-data/instance-id")
+    except OSError:
+        status = None
+    if status != 200:
+        return "WARNING", "Metadata service not available"
+    metadata = {"instance_id": instance_id}
+    keys = {
+        "instance_type": "instance-type",
+        "availability_zone": "placement/availability-zone",
+        "region": "placement/region",
+        "ami_id": "ami-id",
+        "public_ip": "public-ipv4",
+    }
+    # Fetch the remaining fields concurrently
+    answers = await asyncio.gather(
+        *(http_get(METADATA_URL, 80, f"/latest/meta-data/{path}") for path in keys.values()),
+        return_exceptions=True,
+    )
+    for key, answer in zip(keys, answers):
+        ok = not isinstance(answer, Exception) and answer[0] == 200
+        metadata[key] = answer[1].strip() if ok else "Not available"
+    return "OK", metadata
+
+
+@check("public_ip", "Network Connectivity", timeout=4)
+async def check_public_ip(results):
+    try:
+        status, body = await http_get("checkip.amazonaws.com")
+    except OSError as e:
+        return "WARNING", f"Could not determine public IP: {e}"
+    if status != 200:
+        return "WARNING", f"HTTP {status}"
+    return "INFO", body.strip()
+
+
+@check("internet", "Network Connectivity", timeout=4)
+async def check_internet(results):
+    status, _ = await http_get("www.google.com")
+    return "OK", f"google.com answered HTTP {status}"
+
+
+def port_check(port, closed_status="WARNING"):
+    async def run(results):
+        if await port_open('127.0.0.1', port):
+            return "OK", "Open"
+        return closed_status, "Closed or filtered"
+    return run
+
+
+check("port_22", "Ports", timeout=2)(port_check(22))
+check("port_80", "Ports", timeout=2)(port_check(80))
+check("port_443", "Ports", timeout=2)(port_check(443, closed_status="INFO"))
+check(f"port_{APP_PORT}", "Ports", timeout=2)(port_check(APP_PORT))
+
+
+@check("http_80", "Application", deps=("port_80",), timeout=3)
+async def check_http_80(results):
+    status, _ = await http_get('127.0.0.1', 80)
+    return ("OK" if status < 500 else "ERROR"), f"HTTP {status}"
+
+
+@check("app_http", "Application", deps=(f"port_{APP_PORT}",), timeout=3)
+async def check_app_http(results):
+    status, _ = await http_get('127.0.0.1', APP_PORT, "/health")
+    return ("OK" if status == 200 else "ERROR"), f"/health answered HTTP {status}"
+
+
+@check("app_ready", "Application", deps=(f"port_{APP_PORT}",), timeout=3)
+async def check_app_ready(results):
+    status, body = await http_get('127.0.0.1', APP_PORT, "/ready")
+    try:
+        details = json.loads(body)
+    except ValueError:
+        details = body
+    return ("OK" if status == 200 else "ERROR"), details
+
+
+@check("nginx_service", "Service Status", timeout=3)
+async def check_nginx_service(results):
+    state = await command_output("systemctl is-active nginx")
+    return ("OK" if state == "active" else "ERROR"), state or "unknown"
+
+
+@check("search_agent_service", "Service Status", timeout=3)
+async def check_search_agent_service(results):
+    state = await command_output("systemctl is-active search-agent")
+    return ("OK" if state == "active" else "ERROR"), state or "unknown"
+
+
+@check("nginx_installed", "Nginx Configuration", timeout=2)
+async def check_nginx_installed(results):
+    if not await which("nginx"):
+        return "WARNING", "nginx not found"
+    return "OK", await command_output("nginx -v 2>&1")
+
+
+@check("nginx_syntax", "Nginx Configuration", deps=("nginx_installed",), timeout=5)
+async def check_nginx_syntax(results):
+    returncode, output = await run_command("sudo -n nginx -t 2>&1")
+    return ("OK" if returncode == 0 else "ERROR"), output
+
+
+@check("nginx_config", "Nginx Configuration", deps=("nginx_installed",), timeout=3)
+async def check_nginx_config(results):
+    for conf_path in ["/etc/nginx/conf.d/search-agent.conf",
+                      "/etc/nginx/sites-enabled/search-agent",
+                      "/etc/nginx/sites-available/search-agent.conf"]:
+        if os.path.exists(conf_path):
+            conf = await command_output(f"cat {conf_path}")
+            if "proxy_http_version 1.1" in conf and "Upgrade" in conf:
+                return "OK", f"{conf_path}: WebSocket configuration appears correct"
+            return "WARNING", f"{conf_path}: WebSocket headers might be missing"
+    return "WARNING", "Could not locate Search Agent configuration file"
+
+
+@check("listening_ports", "Listening Ports", timeout=3)
+async def check_listening_ports(results):
+    ports = await command_output(
+        "ss -tulpn 2>/dev/null | grep LISTEN || netstat -tulpn 2>/dev/null | grep LISTEN"
+    )
+    if not ports:
+        return "WARNING", "Could not get listening ports (try running as root)"
+    return "INFO", ports
+
+
+@check("firewall", "Firewall", timeout=5)
+async def check_firewall(results):
+    tools = ["iptables", "firewall-cmd", "ufw"]
+    present = await asyncio.gather(*(which(tool) for tool in tools))
+    found = {tool: is_present for tool, is_present in zip(tools, present)}
+    info = {"present": [tool for tool in tools if found[tool]]}
+    if found["firewall-cmd"]:
+        info["firewalld"] = await command_output("systemctl is-active firewalld")
+    if found["ufw"]:
+        info["ufw"] = await command_output("sudo -n ufw status")
+    return "INFO", info
+
+
+@check("aws_cli", "AWS", timeout=5)
+async def check_aws_cli(results):
+    version = await command_output("aws --version 2>&1")
+    if "aws-cli" not in version:
+        return "WARNING", "AWS CLI not installed"
+    return "OK", version
+
+
+@check("security_groups", "AWS", deps=("instance_metadata", "aws_cli"), timeout=15)
+async def check_security_groups(results):
+    metadata = results["instance_metadata"]["value"]
+    returncode, output = await run_command(
+        f"aws ec2 describe-instance-attribute --instance-id {metadata['instance_id']} "
+        f"--attribute groupSet --region {metadata['region']} --output json"
+    )
+    if returncode != 0:
+        return "WARNING", "Could not describe security groups"
+    return "INFO", json.loads(output)
+
+
+#
+# Engine
+#
+
+async def run_checks(names=None, timeout=None):
+    """Runs the checks concurrently, respecting dependencies, returns results by name"""
+    selected = [CHECKS[name] for name in (names or CHECKS)]
+    # Pull in dependencies of the selected checks
+    pending = list(selected)
+    while pending:
+        for dep in pending.pop().deps:
+            if CHECKS[dep] not in selected:
+                selected.append(CHECKS[dep])
+                pending.append(CHECKS[dep])
+    order = list(CHECKS.values())
+    selected.sort(key=order.index)
+
+    results = {}
+    tasks = {}
+
+    async def run_one(item):
+        if item.deps:
+            await asyncio.gather(*(tasks[dep] for dep in item.deps))
+        failed = [dep for dep in item.deps if results[dep]["status"] not in PASSING]
+        if failed:
+            results[item.name] = {
+                "status": "SKIPPED",
+                "value": f"Needs {', '.join(failed)}",
+                "duration_ms": 0,
+            }
+            return
+
+        limit = timeout or item.timeout
+        start = time.monotonic()
+        try:
+            status, value = await asyncio.wait_for(item.func(results), limit)
+        except asyncio.TimeoutError:
+            status, value = "TIMEOUT", f"No answer within {limit}s"
+        except Exception as e:
+            status, value = "ERROR", f"{type(e).__name__}: {e}"
+        results[item.name] = {
+            "status": status,
+            "value": value,
+            "duration_ms": round((time.monotonic() - start) * 1000),
+        }
+
+    # Every task exists before any of them runs, so dependencies can be awaited
+    for item in selected:
+        tasks[item.name] = asyncio.ensure_future(run_one(item))
+    await asyncio.gather(*tasks.values())
+    return {item.name: results[item.name] for item in selected}
+
+
+async def run_local(names=None, timeout=None):
+    start = time.monotonic()
+    checks = await run_checks(names, timeout)
+    return {
+        "host": platform.node(),
+        "duration_ms": round((time.monotonic() - start) * 1000),
+        "checks": checks,
+    }
+
+
+async def run_remote(host, key=None, names=None, timeout=None, host_timeout=120):
+    """Runs this script on host over SSH and returns its JSON report"""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        source = f.read()
+    remote_args = ["--json"]
+    if names:
+        remote_args += ["--only", ",".join(names)]
+    if timeout:
+        remote_args += ["--timeout", str(timeout)]
+    command = ["ssh", "-o", "BatchMode=yes", "-o", "ConnectTimeout=10"]
+    if key:
+        command += ["-i", key]
+    command += [host, "python3", "-"] + remote_args
+
+    start = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(source), host_timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        return {"host": host, "error": f"No answer within {host_timeout}s"}
+    try:
+        report = json.loads(stdout)
+    except ValueError:
+        return {"host": host, "error": stderr.decode('utf-8', 'replace').strip() or "No report"}
+    report["host"] = host
+    report["duration_ms"] = round((time.monotonic() - start) * 1000)
+    return report
+
+
+async def run_fleet(hosts, key=None, names=None, timeout=None, parallel=20):
+    """Runs the checks on many hosts at once (at most `parallel` SSH sessions)"""
+    limit = asyncio.Semaphore(parallel)
+
+    async def one(host):
+        async with limit:
+            return await run_remote(host, key, names, timeout)
+
+    return await asyncio.gather(*(one(host) for host in hosts))
+
+
+#
+# Output
+#
+
+def print_header(message):
+    """Print a formatted header"""
+    print(f"\n{BLUE}{BOLD}{'=' * 60}{END}")
+    print(f"{BLUE}{BOLD} {message}{END}")
+    print(f"{BLUE}{BOLD}{'=' * 60}{END}\n")
+
+
+def print_result(name, status, message=None):
+    """Print a formatted test result"""
+    if status in PASSING:
+        status_color = GREEN
+    elif status in ("WARNING", "SKIPPED"):
+        status_color = YELLOW
+    else:
+        status_color = RED
+
+    print(f"{BOLD}{name}:{END} {status_color}{status}{END}")
+    if message:
+        print(f"  → {message}")
+
+
+def format_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, indent=2).replace("\n", "\n    ")
+    return str(value).replace("\n", "\n    ")
+
+
+def print_report(report):
+    print_header(f"{report['host']} ({report.get('duration_ms', 0)} ms)")
+    if "error" in report:
+        print_result("SSH", "ERROR", report["error"])
+        return
+    section = None
+    for name, result in report["checks"].items():
+        if CHECKS[name].section != section:
+            section = CHECKS[name].section
+            print(f"\n{BOLD}{section}{END}")
+        print_result(
+            f"{name} [{result['duration_ms']} ms]",
+            result["status"],
+            format_value(result["value"]),
+        )
+
+
+def report_failed(report):
+    if "error" in report:
+        return True
+    return any(r["status"] in ("ERROR", "TIMEOUT") for r in report["checks"].values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run EC2 diagnostics concurrently')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--only', help='Comma separated checks to run (dependencies are added)')
+    parser.add_argument('--timeout', type=float, help='Override every per-check timeout (seconds)')
+    parser.add_argument('--hosts', help='Comma separated SSH hosts to run the checks on')
+    parser.add_argument('--key', help='SSH private key for --hosts')
+    parser.add_argument('--parallel', type=int, default=20, help='Max concurrent SSH sessions')
+    parser.add_argument('--list', action='store_true', help='List the available checks')
+    args = parser.parse_args()
+
+    if args.list:
+        for item in CHECKS.values():
+            deps = f" (needs {', '.join(item.deps)})" if item.deps else ""
+            print(f"{item.name:22} {item.timeout:>4}s  {item.section}{deps}")
+        return
+
+    names = args.only.split(",") if args.only else None
+    unknown = [name for name in names or [] if name not in CHECKS]
+    if unknown:
+        parser.error(f"Unknown checks: {', '.join(unknown)}")
+
+    if args.hosts:
+        hosts = [host for host in args.hosts.split(",") if host]
+        reports = asyncio.run(run_fleet(hosts, args.key, names, args.timeout, args.parallel))
+    else:
+        reports = [asyncio.run(run_local(names, args.timeout))]
+
+    if args.json:
+        print(json.dumps(reports if args.hosts else reports[0], indent=2))
+    else:
+        for report in reports:
+            print_report(report)
+    sys.exit(1 if any(report_failed(report) for report in reports) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,17 @@ This script has minimal dependencies and should work on any Amazon Linux instanc
 
 Usage:
     python ec2_quick_check.py
+    python ec2_quick_check.py --ready   # only query /ready, exit 1 if not ready
 """
 
 import os
+import sys
+import json
 import socket
 import subprocess
 import platform
 import urllib.request
-from urllib.error import URLError
+from urllib.error import URLError, HTTPError
 
 # ANSI color codes for better readability
 GREEN = '\033[92m'
@@ -62,7 +65,47 @@ def check_port(host, port):
     except:
         return False
 
+def check_readiness(host='localhost', port=8010):
+    """Query the app's /ready endpoint, returns (status_code, details)"""
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/ready", timeout=3) as response:
+            return response.status, json.loads(response.read().decode('utf-8'))
+    except HTTPError as e:
+        # 503 still carries the readiness details in its body
+        try:
+            return e.code, json.loads(e.read().decode('utf-8'))
+        except ValueError:
+            return e.code, {}
+    except (URLError, socket.timeout, ValueError) as e:
+        return None, {"error": str(e)}
+
+def print_readiness(host='localhost', port=8010):
+    """Print the readiness report, returns True if the app is ready"""
+    status, details = check_readiness(host, port)
+    if status is None:
+        print_result("Readiness", "ERROR", f"Could not reach /ready: {details.get('error')}")
+        return False
+
+    if status == 200:
+        print_result("Readiness", "OK", "Instance is ready for traffic")
+    else:
+        reasons = ", ".join(details.get("reasons", [])) or f"HTTP {status}"
+        print_result("Readiness", "ERROR", f"Not ready: {reasons}")
+
+    if "loop_lag_ms" in details:
+        print_result("Event Loop Lag", "INFO",
+                     f"{details['loop_lag_ms']} ms (max {details['loop_lag_max_ms']} ms)")
+        print_result("Active Sessions", "INFO",
+                     f"{details['active_sessions']} / {details['max_sessions']}")
+        print_result("Upstream Error Rate", "INFO",
+                     f"{details['upstream_error_rate']:.1%} "
+                     f"({details['upstream_errors']} of {details['upstream_events']} events)")
+    return status == 200
+
 def main():
+    if "--ready" in sys.argv[1:]:
+        sys.exit(0 if print_readiness() else 1)
+
     print(f"{BOLD}EC2 Quick Check - Diagnostic Tool{END}")
     print("Testing connectivity and configuration issues...\n")
 
@@ -128,6 +171,9 @@ def main():
     print_result("Port 8010 (App)", "OK" if check_port('localhost', 8010) else "WARNING", 
                  "Open" if check_port('localhost', 8010) else "Closed or filtered")
 
+    # Application readiness (event loop lag, sessions, upstream errors)
+    print_readiness()
+
     # 4. Services status
     print_header("Service Status")
     nginx_status = run_command("systemctl is-active nginx")
@@ -185,8 +231,9 @@ def main():
     print("2. Check that port 80 is open in your EC2 security group")
     print("3. Verify that Nginx is correctly proxying to your application")
     print("4. Ensure WebSocket support is properly configured in Nginx")
-    print("5. Check your application logs: sudo journalctl -u search-agent -f")
-    print("6. Check Nginx logs: sudo tail -f /var/log/nginx/error.log")
+    print("5. Check /ready: a 503 means the app is shedding load (see reasons above)")
+    print("6. Check your application logs: sudo journalctl -u search-agent -f")
+    print("7. Check Nginx logs: sudo tail -f /var/log/nginx/error.log")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
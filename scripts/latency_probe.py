@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Latency Probe
+
+Synthetic end-to-end monitor for a deployed Search Agent. On a schedule it
+opens a real /ws/{session_id} connection, asks a canned question and records
+connect time, time to first token and full turn latency. Results go into a
+compact rolling store (one bucket of counters and histograms per minute) and
+are evaluated against availability and latency SLOs using multi-window burn
+rates.
+
+Usage:
+    python latency_probe.py --target http://localhost:8010
+    python latency_probe.py --target https://agent.example.com --interval 60 --store probe.json
+    python latency_probe.py --target http://localhost:8010 --iterations 5 --interval 1   # CI
+    python latency_probe.py --target https://agent.example.com --api-key "$PROBE_API_KEY"
+"""
+
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+import websockets
+
+# ANSI color codes for better readability
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RED = '\033[91m'
+BOLD = '\033[1m'
+END = '\033[0m'
+
+QUESTIONS = [
+    "What is the capital of Australia?",
+    "Who wrote Pride and Prejudice?",
+    "What is the boiling point of water at sea level in Celsius?",
+    "What year did the first moon landing happen?",
+]
+
+# websockets 14 renamed the argument for request headers
+HEADERS_ARG = "additional_headers" if int(websockets.__version__.split(".")[0]) >= 14 else "extra_headers"
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open ended)
+BOUNDS_MS = [50, 100, 250, 500, 1000, 2000, 3000, 5000, 10000, 30000]
+METRICS = ("connect_ms", "ttft_ms", "turn_ms")
+
+# (long window, short window, burn rate threshold) in minutes, after the
+# multi-window alerts of the Google SRE workbook
+BURN_ALERTS = [
+    ("page", 60, 5, 14.4),
+    ("ticket", 360, 30, 6.0),
+]
+
+
+class RollingStore:
+    """Per-minute counters and latency histograms for the last `keep` minutes"""
+
+    def __init__(self, keep: int = 24 * 60):
+        self.keep = keep
+        self.buckets = {}
+
+    def _bucket(self, minute: int):
+        bucket = self.buckets.get(minute)
+        if bucket is None:
+            bucket = {"probes": 0, "ok": 0, "fast": 0, "errors": {}}
+            for metric in METRICS:
+                bucket[metric] = [0] * (len(BOUNDS_MS) + 1)
+            self.buckets[minute] = bucket
+            for old in [m for m in self.buckets if m <= minute - self.keep]:
+                del self.buckets[old]
+        return bucket
+
+    def record(self, result: dict, ttft_slo_ms: float, at: float = None):
+        bucket = self._bucket(int((at or time.time()) // 60))
+        bucket["probes"] += 1
+        if result["ok"]:
+            bucket["ok"] += 1
+            if result["ttft_ms"] <= ttft_slo_ms:
+                bucket["fast"] += 1
+        elif result.get("code"):
+            errors = bucket.setdefault("errors", {})
+            errors[result["code"]] = errors.get(result["code"], 0) + 1
+        for metric in METRICS:
+            value = result.get(metric)
+            if value is not None:
+                index = next((i for i, b in enumerate(BOUNDS_MS) if value <= b), len(BOUNDS_MS))
+                bucket[metric][index] += 1
+
+    def window(self, minutes: int, now: float = None):
+        """Sums the buckets of the last `minutes` minutes"""
+        current = int((now or time.time()) // 60)
+        total = {"probes": 0, "ok": 0, "fast": 0}
+        errors = {}
+        histograms = {metric: [0] * (len(BOUNDS_MS) + 1) for metric in METRICS}
+        for minute, bucket in self.buckets.items():
+            if minute > current - minutes:
+                for key in total:
+                    total[key] += bucket[key]
+                for code, count in bucket.get("errors", {}).items():
+                    errors[code] = errors.get(code, 0) + count
+                for metric in METRICS:
+                    histograms[metric] = [a + b for a, b in zip(histograms[metric], bucket[metric])]
+        total["errors"] = errors
+        return total, histograms
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({str(minute): bucket for minute, bucket in self.buckets.items()}, f)
+
+    def load(self, path: str):
+        try:
+            with open(path) as f:
+                self.buckets = {int(minute): bucket for minute, bucket in json.load(f).items()}
+        except (OSError, ValueError):
+            self.buckets = {}
+
+
+def percentile(histogram, q):
+    """Upper bound (ms) of the bucket holding the q-th percentile"""
+    count = sum(histogram)
+    if not count:
+        return None
+    seen = 0
+    for index, n in enumerate(histogram):
+        seen += n
+        if seen >= q * count:
+            return BOUNDS_MS[index] if index < len(BOUNDS_MS) else float('inf')
+
+
+def burn_rate(bad: int, total: int, objective: float) -> float:
+    """How fast the error budget is being spent (1.0 = exactly on budget)"""
+    if not total:
+        return 0.0
+    return (bad / total) / (1 - objective)
+
+
+def evaluate(store: RollingStore, availability: float, latency: float, now: float = None):
+    """Returns the burn rates and firing alerts for both SLOs"""
+    report = {"slos": {}, "alerts": []}
+    slos = {
+        "availability": (availability, lambda t: t["probes"] - t["ok"]),
+        "latency": (latency, lambda t: t["probes"] - t["fast"]),
+    }
+    for name, (objective, bad) in slos.items():
+        rates = {}
+        for severity, long_window, short_window, threshold in BURN_ALERTS:
+            long_total, _ = store.window(long_window, now)
+            short_total, _ = store.window(short_window, now)
+            long_rate = burn_rate(bad(long_total), long_total["probes"], objective)
+            short_rate = burn_rate(bad(short_total), short_total["probes"], objective)
+            rates[f"{long_window}m"] = round(long_rate, 2)
+            rates[f"{short_window}m"] = round(short_rate, 2)
+            if long_rate > threshold and short_rate > threshold:
+                report["alerts"].append(f"{name} {severity}: burn {long_rate:.1f}x over {long_window}m")
+        report["slos"][name] = {"objective": objective, "burn_rates": rates}
+    return report
+
+
+async def probe_once(target: str, question: str, timeout: float, api_key: str = None) -> dict:
+    """Asks one question over a fresh websocket and times the answer"""
+    url = target.replace("http://", "ws://").replace("https://", "wss://").rstrip("/")
+    url = f"{url}/ws/probe-{uuid.uuid4().hex[:12]}"
+    result = {"ok": False, "connect_ms": None, "ttft_ms": None, "turn_ms": None, "chunks": 0}
+    headers = {HEADERS_ARG: {"x-api-key": api_key}} if api_key else {}
+    start = time.perf_counter()
+    try:
+        async with websockets.connect(url, open_timeout=timeout, **headers) as ws:
+            connected = time.perf_counter()
+            result["connect_ms"] = round((connected - start) * 1000, 1)
+            await ws.send(question)
+            sent = time.perf_counter()
+            deadline = sent + timeout
+            while True:
+                frame = json.loads(
+                    await asyncio.wait_for(ws.recv(), max(0.0, deadline - time.perf_counter()))
+                )
+                # Refused by the server (bad key, rate limit, quota) or the
+                # upstream stream failed: no point waiting out the timeout
+                if frame.get("error"):
+                    result["error"] = frame["error"]
+                    result["code"] = frame.get("code")
+                    return result
+                if frame.get("message"):
+                    result["chunks"] += 1
+                    if result["ttft_ms"] is None:
+                        result["ttft_ms"] = round((time.perf_counter() - sent) * 1000, 1)
+                if frame.get("turn_complete"):
+                    result["turn_ms"] = round((time.perf_counter() - sent) * 1000, 1)
+                    result["trace_id"] = frame.get("trace_id")
+                    result["ok"] = result["ttft_ms"] is not None
+                    if not result["ok"]:
+                        result["error"] = "Turn completed without any text"
+                    return result
+    except asyncio.TimeoutError:
+        result["error"] = f"No answer within {timeout}s"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def print_probe(result):
+    if result["ok"]:
+        print(f"{GREEN}OK{END}    connect {result['connect_ms']} ms, "
+              f"ttft {result['ttft_ms']} ms, turn {result['turn_ms']} ms "
+              f"({result['chunks']} chunks, trace {result.get('trace_id')})")
+    else:
+        code = f" ({result['code']})" if result.get("code") else ""
+        print(f"{RED}FAIL{END}  {result.get('error')}{code}")
+
+
+def print_evaluation(store, report, minutes=60):
+    total, histograms = store.window(minutes)
+    summary = ", ".join(
+        f"{metric} p50<={percentile(histograms[metric], 0.5)} p95<={percentile(histograms[metric], 0.95)}"
+        for metric in METRICS
+    )
+    print(f"{BOLD}Last {minutes}m:{END} {total['ok']}/{total['probes']} ok; {summary}")
+    if total["errors"]:
+        print("  errors: " + ", ".join(f"{code} x{count}" for code, count in total["errors"].items()))
+    for name, slo in report["slos"].items():
+        rates = ", ".join(f"{window} {rate}x" for window, rate in slo["burn_rates"].items())
+        print(f"  {name} ({slo['objective']:.2%}): burn {rates}")
+    for alert in report["alerts"]:
+        print(f"  {RED}{BOLD}ALERT{END} {alert}")
+
+
+async def run(args):
+    store = RollingStore()
+    if args.store:
+        store.load(args.store)
+    ttft_slo_ms = args.ttft_slo * 1000
+    iteration = 0
+    failures = 0
+    while args.iterations is None or iteration < args.iterations:
+        iteration += 1
+        question = random.choice(QUESTIONS)
+        result = await probe_once(args.target, question, args.timeout, args.api_key)
+        failures += not result["ok"]
+        store.record(result, ttft_slo_ms)
+        print_probe(result)
+        if args.store:
+            store.save(args.store)
+        if iteration % args.report_every == 0:
+            print_evaluation(store, evaluate(store, args.availability, args.latency))
+        if args.iterations is None or iteration < args.iterations:
+            await asyncio.sleep(args.interval)
+
+    report = evaluate(store, args.availability, args.latency)
+    print_evaluation(store, report)
+    return failures, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic latency probe and SLO monitor')
+    parser.add_argument('--target', default='http://localhost:8010', help='Base URL of the instance')
+    parser.add_argument('--api-key', help='Tenant API key, sent as the x-api-key header')
+    parser.add_argument('--interval', type=float, default=60, help='Seconds between probes')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds allowed per turn')
+    parser.add_argument('--iterations', type=int, help='Stop after this many probes (default: run forever)')
+    parser.add_argument('--store', help='JSON file keeping the rolling store between runs')
+    parser.add_argument('--ttft-slo', type=float, default=3.0, help='Time to first token target (seconds)')
+    parser.add_argument('--availability', type=float, default=0.99, help='Availability objective')
+    parser.add_argument('--latency', type=float, default=0.95,
+                        help='Fraction of probes that must meet the TTFT target')
+    parser.add_argument('--report-every', type=int, default=10, help='Print SLO status every N probes')
+    args = parser.parse_args()
+
+    try:
+        failures, report = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return
+    # In CI (--iterations) any failed probe or firing alert fails the run
+    sys.exit(1 if failures or report["alerts"] else 0)
+
+
+if __name__ == "__main__":
+    main()
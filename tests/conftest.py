@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fakes import agent_sessions, fake_start_agent_session, fake_end_agent_session
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The app with its model stream replaced by tests.fakes"""
+    from app import main
+
+    monkeypatch.setattr(main, "start_agent_session", fake_start_agent_session)
+    monkeypatch.setattr(main, "end_agent_session", fake_end_agent_session)
+    yield main
+    main.resumable_sessions.clear()
+    agent_sessions.clear()
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+
+class FakeLiveRequestQueue:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.closed = False
+
+    def send_content(self, content):
+        self.messages.put_nowait(content.parts[0].text)
+
+    def close(self):
+        self.closed = True
+        self.messages.put_nowait(None)
+
+
+def fake_event(**fields):
+    event = SimpleNamespace(
+        partial=None, content=None, turn_complete=False, interrupted=False,
+        error_code=None, error_message=None, grounding_metadata=None,
+        usage_metadata=None,
+    )
+    event.__dict__.update(fields)
+    event.get_function_calls = lambda: []
+    event.get_function_responses = lambda: []
+    return event
+
+
+def text_chunk(text):
+    return fake_event(partial=True, content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))
+
+
+# (user_id, session_id) of the ADK sessions the fakes were asked to open
+agent_sessions = set()
+
+
+def fake_start_agent_session(session_id, user_id=None, profile=None):
+    """Stands in for run_live: a message "N" is answered with N text chunks"""
+    agent_sessions.add((user_id, session_id))
+    queue = FakeLiveRequestQueue()
+
+    async def live_events():
+        while True:
+            text = await queue.messages.get()
+            if text is None:
+                return
+            for i in range(int(text) if text.isdigit() else 3):
+                yield text_chunk(f"{i} ")
+                await asyncio.sleep(0.002)
+            yield fake_event(turn_complete=True)
+
+    return live_events(), queue
+
+
+def fake_end_agent_session(session_id, user_id=None):
+    agent_sessions.discard((user_id, session_id))
@@ -0,0 +1,25 @@
+from urllib.parse import quote
+
+from starlette.testclient import TestClient
+
+MARKUP = "<img src=x onerror=alert(1)>"
+
+
+def test_unknown_agent_name_is_quoted_and_truncated(server):
+    name = MARKUP + "x" * 200
+    with TestClient(server.app) as client:
+        with client.websocket_connect(f"/ws/agent?agent={quote(name)}") as ws:
+            reply = ws.receive_json()
+    assert reply["code"] == "unknown_agent"
+    assert reply["error"] == f"Unknown agent {name[:64]!r}"
+    assert "x" * 100 not in reply["error"]
+
+
+def test_unknown_agent_over_mux_is_quoted(server):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/mux") as ws:
+            ws.send_json({"type": "open", "stream": 1, "agent": MARKUP})
+            reply = ws.receive_json()
+    assert reply["stream"] == 1
+    assert reply["code"] == "unknown_agent"
+    assert reply["error"] == f"Unknown agent {MARKUP!r}"
@@ -0,0 +1,127 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app import assets
+from app.assets import Asset, StaticAssets, StaticAssetsApp, accepted_encodings, build
+
+CSS = b"body { color: black; }\n" * 50
+JS = b"console.log('hello');\n" * 50
+INDEX = (
+    b'<link rel="stylesheet" href="/static/style.css">\n'
+    b'<script src="/static/app.js"></script>\n'
+    b'<p>' + b"text " * 200 + b'</p>\n'
+)
+
+
+@pytest.fixture
+def files():
+    return {"index.html": INDEX, "style.css": CSS, "app.js": JS}
+
+
+def test_build_fingerprints_and_rewrites_references(files):
+    manifest, outputs = build(files)
+    assert manifest == {
+        "style.css": f"style.{assets.content_hash(CSS)}.css",
+        "app.js": f"app.{assets.content_hash(JS)}.js",
+    }
+    index = outputs["index.html"].decode()
+    assert f'href="/static/{manifest["style.css"]}"' in index
+    assert f'src="/static/{manifest["app.js"]}"' in index
+    assert "/static/style.css" not in index
+    # Entry points keep their name; compressed versions sit next to each output
+    assert outputs[manifest["style.css"]] == CSS
+    assert {"index.html.gz", f"{manifest['app.js']}.gz"} <= set(outputs)
+
+
+def test_fingerprint_changes_with_content(files):
+    manifest, _ = build(files)
+    changed, _ = build({**files, "style.css": CSS + b"p {}\n"})
+    assert changed["style.css"] != manifest["style.css"]
+    assert changed["app.js"] == manifest["app.js"]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", {"gzip", "deflate", "br"}),
+    ("br;q=0, gzip;q=0.5", {"gzip"}),
+    ("GZIP", {"gzip"}),
+    ("gzip;q=oops", set()),
+    ("", {""}),
+])
+def test_accepted_encodings(header, expected):
+    assert accepted_encodings(header) == expected
+
+
+@pytest.fixture
+def asset():
+    variants = {"gzip": b"gz-body"}
+    if assets.brotli is not None:
+        variants["br"] = b"br-body"
+    return Asset("style.css", CSS, variants, immutable=True)
+
+
+def test_negotiates_best_accepted_encoding(asset):
+    if "br" in asset.bodies:
+        response = asset.response({"accept-encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "br"
+        assert response.body == b"br-body"
+
+    response = asset.response({"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == asset.etags["gzip"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == assets.IMMUTABLE
+
+    response = asset.response({})
+    assert "content-encoding" not in response.headers
+    assert response.body == CSS
+    assert response.headers["etag"] == asset.etags["identity"]
+
+
+def test_not_modified_only_for_the_representation_sent(asset):
+    gzip = {"accept-encoding": "gzip"}
+    response = asset.response({**gzip, "if-none-match": asset.etags["gzip"]})
+    assert response.status_code == 304
+    assert response.headers["etag"] == asset.etags["gzip"]
+    assert response.body == b""
+
+    # A weak or listed tag still matches
+    response = asset.response({**gzip, "if-none-match": f'"other", W/{asset.etags["gzip"]}'})
+    assert response.status_code == 304
+    assert asset.response({**gzip, "if-none-match": "*"}).status_code == 304
+
+    # The ETag of another encoding (or of the identity copy) doesn't validate gzip
+    for other in set(asset.etags) - {"gzip"}:
+        response = asset.response({**gzip, "if-none-match": asset.etags[other]})
+        assert response.status_code == 200
+        assert response.body == b"gz-body"
+
+    response = asset.response({"if-none-match": asset.etags["gzip"]})
+    assert response.status_code == 200
+    assert response.body == CSS
+
+
+def test_static_app_serves_from_memory_with_fallback(tmp_path, files):
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / "big.bin").write_bytes(b"x" * (assets.MAX_ASSET_SIZE + 1))
+    static_assets = StaticAssets(str(tmp_path))
+    static_assets.load()
+    assert static_assets.source == "memory"
+
+    async def fallback(scope, receive, send):
+        await send({"type": "http.response.start", "status": 299, "headers": []})
+        await send({"type": "http.response.body", "body": b"fallback"})
+
+    client = TestClient(StaticAssetsApp(static_assets, fallback))
+    fingerprinted = static_assets.manifest["style.css"]
+    response = client.get(f"/{fingerprinted}", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content == CSS
+    assert response.headers["cache-control"] == assets.IMMUTABLE
+
+    # The original name still works, but revalidates
+    response = client.get("/style.css", headers={"accept-encoding": "identity"})
+    assert response.content == CSS
+    assert response.headers["cache-control"] == assets.REVALIDATE
+
+    assert client.get("/big.bin").text == "fallback"
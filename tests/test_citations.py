@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from starlette.testclient import TestClient
+
+from app.citations import CitationTracker
+from tests.fakes import fake_event, fake_start_agent_session
+
+
+def grounded(*uris):
+    chunks = [
+        SimpleNamespace(web=SimpleNamespace(uri=uri, title=uri.upper()), retrieved_context=None)
+        for uri in uris
+    ]
+    return SimpleNamespace(grounding_metadata=SimpleNamespace(grounding_chunks=chunks))
+
+
+def test_sources_once_per_turn_with_stable_indices():
+    tracker = CitationTracker()
+    first = tracker.new_citations(grounded("a", "b"))
+    assert [(c["index"], c["uri"]) for c in first] == [(1, "a"), (2, "b")]
+    # Repeated within the answer: nothing new
+    assert tracker.new_citations(grounded("b", "a")) == []
+
+    tracker.end_turn()
+    # The next answer relies on "b" again: it is listed, with its old index
+    second = tracker.new_citations(grounded("b", "c"))
+    assert [(c["index"], c["uri"]) for c in second] == [(2, "b"), (3, "c")]
+    assert tracker.new_citations(grounded("c")) == []
+
+
+def test_new_turn_lists_reused_source_over_websocket(server, monkeypatch):
+    turns = iter([["https://a.example", "https://b.example"], ["https://b.example"]])
+
+    def start(session_id, user_id=None, profile=None):
+        live_events, queue = fake_start_agent_session(session_id)
+
+        async def grounded_events():
+            async for event in live_events:
+                if event.turn_complete:
+                    yield fake_event(grounding_metadata=grounded(*next(turns)).grounding_metadata)
+                yield event
+
+        return grounded_events(), queue
+
+    monkeypatch.setattr(server, "start_agent_session", start)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/citations") as ws:
+            cited = []
+            for _ in range(2):
+                ws.send_text("1")
+                frames = []
+                while not frames or not frames[-1].get("turn_complete"):
+                    frames.append(ws.receive_json())
+                cited.append([
+                    (f["citation"]["index"], f["citation"]["uri"]) for f in frames if "citation" in f
+                ])
+    assert cited == [
+        [(1, "https://a.example"), (2, "https://b.example")],
+        [(2, "https://b.example")],
+    ]
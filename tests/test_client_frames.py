@@ -0,0 +1,44 @@
+import pytest
+from starlette.testclient import TestClient
+
+from tests.fakes import agent_sessions
+
+BAD_TEXTS = [5, None, "", ["hi"], {"text": "hi"}]
+
+
+def requests_counted(server):
+    return server.tenants.usage.get("default", {}).get("requests", 0)
+
+
+@pytest.mark.parametrize("text", BAD_TEXTS)
+def test_bad_message_text_is_an_error_frame_on_ws(server, text):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/frames") as ws:
+            assert "resume_token" in ws.receive_json()
+            counted = requests_counted(server)
+            ws.send_json({"type": "message", "text": text})
+            reply = ws.receive_json()
+            assert reply["code"] == "bad_request"
+            assert not agent_sessions
+            assert requests_counted(server) == counted
+
+            # The connection stays usable
+            ws.send_json({"type": "message", "text": "1"})
+            assert ws.receive_json()["message"] == "0 "
+            assert ws.receive_json()["turn_complete"]
+
+
+@pytest.mark.parametrize("text", BAD_TEXTS)
+def test_bad_message_text_is_an_error_frame_on_mux(server, text):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/mux") as ws:
+            ws.send_json({"stream": "a", "type": "open"})
+            assert ws.receive_json()["opened"]
+            counted = requests_counted(server)
+            ws.send_json({"stream": "a", "type": "message", "text": text})
+            assert ws.receive_json() == {
+                "stream": "a", "error": "Message text must be a non-empty string",
+            }
+            # Rejected before the upstream stream is opened or a request counted
+            assert not agent_sessions
+            assert requests_counted(server) == counted
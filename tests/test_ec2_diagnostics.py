@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import subprocess
+import importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts', 'ec2_diagnostics.py'))
+
+spec = importlib.util.spec_from_file_location("ec2_diagnostics", SCRIPT)
+diagnostics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(diagnostics)
+
+
+@pytest.fixture
+def stub_path(tmp_path, monkeypatch):
+    """A PATH holding only the stub commands the test writes"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", str(bin_dir))
+
+    def write(name, body):
+        path = bin_dir / name
+        path.write_text("#!/bin/sh\n" + body)
+        path.chmod(0o755)
+        return path
+
+    return write
+
+
+def run(names, timeout=None):
+    return asyncio.run(diagnostics.run_checks(names, timeout))
+
+
+def register(monkeypatch, name, result=None, deps=(), delay=0):
+    async def func(results):
+        await asyncio.sleep(delay)
+        return result
+
+    monkeypatch.setitem(diagnostics.CHECKS, name, diagnostics.Check(name, func, "Test", deps))
+
+
+def test_failed_dependency_skips_dependents(monkeypatch):
+    register(monkeypatch, "base", ("ERROR", "down"), delay=0.05)
+    register(monkeypatch, "child", ("OK", "fine"), deps=("base",))
+    register(monkeypatch, "grandchild", ("OK", "fine"), deps=("child",))
+    register(monkeypatch, "info_base", ("INFO", "fyi"))
+    register(monkeypatch, "info_child", ("OK", "fine"), deps=("info_base",))
+
+    results = run(["grandchild", "info_child"])
+
+    # Dependencies are pulled in, and results come back in registration order
+    assert list(results) == ["base", "child", "grandchild", "info_base", "info_child"]
+    assert results["base"]["status"] == "ERROR"
+    assert results["child"] == {"status": "SKIPPED", "value": "Needs base", "duration_ms": 0}
+    assert results["grandchild"]["status"] == "SKIPPED"
+    assert results["info_child"]["status"] == "OK"
+
+
+def test_nginx_checks_skipped_without_nginx(stub_path):
+    results = run(["nginx_syntax", "nginx_config"])
+    assert results["nginx_installed"]["status"] == "WARNING"
+    assert results["nginx_syntax"]["status"] == "SKIPPED"
+    assert results["nginx_config"]["status"] == "SKIPPED"
+
+
+def test_stub_commands_are_used(stub_path):
+    stub_path("nginx", 'echo "nginx version: nginx/1.99.0"\n')
+    stub_path("systemctl", 'if [ "$2" = nginx ]; then echo active; else echo inactive; fi\n')
+
+    results = run(["nginx_installed", "nginx_service", "search_agent_service"])
+    assert results["nginx_installed"] == {
+        "status": "OK", "value": "nginx version: nginx/1.99.0",
+        "duration_ms": results["nginx_installed"]["duration_ms"],
+    }
+    assert results["nginx_service"]["status"] == "OK"
+    assert results["search_agent_service"]["status"] == "ERROR"
+    assert results["search_agent_service"]["value"] == "inactive"
+
+
+def test_timeout_kills_the_whole_process_group(stub_path, tmp_path):
+    pid_file = tmp_path / "child.pid"
+    # A hung systemctl that also started a grandchild holding the pipes
+    stub_path("systemctl", f"/bin/sleep 30 &\necho $! > {pid_file}\n/bin/sleep 30\n")
+
+    start = time.monotonic()
+    results = run(["nginx_service"], timeout=0.5)
+    elapsed = time.monotonic() - start
+
+    assert results["nginx_service"]["status"] == "TIMEOUT"
+    assert results["nginx_service"]["value"] == "No answer within 0.5s"
+    assert elapsed < 5
+    grandchild = int(pid_file.read_text())
+    # Killed and reaped by its parent's exit, or at least no longer running
+    for _ in range(50):
+        try:
+            os.kill(grandchild, 0)
+        except ProcessLookupError:
+            break
+        with open(f"/proc/{grandchild}/stat") as f:
+            if f.read().split()[2] == "Z":
+                break
+        time.sleep(0.05)
+    else:
+        pytest.fail("grandchild of the timed out command is still running")
+
+
+@pytest.fixture
+def app_server(monkeypatch):
+    """A loopback HTTP server standing in for the app on APP_PORT"""
+    answers = {
+        "/health": (200, {"status": "ok"}),
+        "/ready": (503, {"status": "not ready", "reasons": ["loop lag"]}),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = answers.get(self.path, (404, {}))
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+    # The checks keep their names (port_8010), they just look at the test port
+    monkeypatch.setattr(
+        diagnostics.CHECKS[f"port_{diagnostics.APP_PORT}"], "func", diagnostics.port_check(port)
+    )
+    monkeypatch.setattr(diagnostics, "APP_PORT", port)
+    yield answers
+    server.shutdown()
+    server.server_close()
+
+
+def test_app_checks_against_loopback_server(app_server):
+    results = run(["app_http", "app_ready"])
+    assert results["port_8010"]["status"] == "OK"
+    assert results["app_http"]["status"] == "OK"
+    assert results["app_http"]["value"] == "/health answered HTTP 200"
+    assert results["app_ready"]["status"] == "ERROR"
+    assert results["app_ready"]["value"] == {"status": "not ready", "reasons": ["loop lag"]}
+
+    app_server["/ready"] = (200, {"status": "ready"})
+    assert run(["app_ready"])["app_ready"]["status"] == "OK"
+
+
+def test_app_checks_skipped_when_port_closed(monkeypatch):
+    monkeypatch.setattr(
+        diagnostics.CHECKS["port_8010"], "func", diagnostics.port_check(1)
+    )
+    results = run(["app_http", "app_ready"])
+    assert results["port_8010"]["status"] == "WARNING"
+    assert results["app_http"]["status"] == "SKIPPED"
+    assert results["app_ready"]["status"] == "SKIPPED"
+
+
+def test_json_output_shape(stub_path, tmp_path):
+    stub_path("systemctl", "echo active\n")
+    env = {**os.environ, "PATH": str(tmp_path / "bin")}
+    proc = subprocess.run(
+        [sys.executable, SCRIPT, "--json", "--only", "nginx_service,nginx_syntax"],
+        capture_output=True, text=True, env=env, timeout=30,
+    )
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(proc.stdout)
+    assert set(report) == {"host", "duration_ms", "checks"}
+    assert isinstance(report["duration_ms"], int)
+    assert list(report["checks"]) == ["nginx_service", "nginx_installed", "nginx_syntax"]
+    for result in report["checks"].values():
+        assert set(result) == {"status", "value", "duration_ms"}
+    assert report["checks"]["nginx_service"]["status"] == "OK"
+    assert report["checks"]["nginx_installed"]["status"] == "WARNING"
+    assert report["checks"]["nginx_syntax"]["status"] == "SKIPPED"
@@ -0,0 +1,126 @@
+import os
+import time
+import socket
+import asyncio
+import threading
+import importlib.util
+
+import pytest
+import uvicorn
+
+from app.tenancy import TenantError
+
+SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts', 'latency_probe.py'))
+
+spec = importlib.util.spec_from_file_location("latency_probe", SCRIPT)
+probe = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(probe)
+
+# A fixed minute boundary keeps the windows deterministic
+NOW = 1_000_000 * 60
+
+
+def ok(ttft_ms=100):
+    return {"ok": True, "connect_ms": 10, "ttft_ms": ttft_ms, "turn_ms": ttft_ms * 2}
+
+
+def failed(code=None):
+    return {"ok": False, "connect_ms": 10, "ttft_ms": None, "turn_ms": None, "code": code}
+
+
+def test_burn_rate():
+    assert probe.burn_rate(0, 0, 0.99) == 0.0
+    assert probe.burn_rate(1, 100, 0.99) == pytest.approx(1.0)
+    assert probe.burn_rate(10, 100, 0.99) == pytest.approx(10.0)
+    assert probe.burn_rate(5, 100, 0.95) == pytest.approx(1.0)
+
+
+def test_window_sums_only_recent_minutes():
+    store = probe.RollingStore()
+    store.record(ok(80), ttft_slo_ms=3000, at=NOW - 10 * 60)
+    store.record(ok(4000), ttft_slo_ms=3000, at=NOW - 2 * 60)
+    store.record(failed("rate_limited"), ttft_slo_ms=3000, at=NOW)
+    store.record(failed("rate_limited"), ttft_slo_ms=3000, at=NOW + 30)
+
+    total, histograms = store.window(5, now=NOW)
+    assert total == {"probes": 3, "ok": 1, "fast": 0, "errors": {"rate_limited": 2}}
+    # 4000 ms lands in the (3000, 5000] bucket
+    assert histograms["ttft_ms"][probe.BOUNDS_MS.index(5000)] == 1
+    assert sum(histograms["ttft_ms"]) == 1
+    assert sum(histograms["connect_ms"]) == 3
+
+    total, _ = store.window(60, now=NOW)
+    assert (total["probes"], total["ok"], total["fast"]) == (4, 2, 1)
+    assert probe.percentile(histograms["ttft_ms"], 0.5) == 5000
+    assert probe.percentile([0] * (len(probe.BOUNDS_MS) + 1), 0.5) is None
+
+
+def test_old_minutes_are_dropped_and_store_round_trips(tmp_path):
+    store = probe.RollingStore(keep=5)
+    store.record(ok(), ttft_slo_ms=3000, at=NOW - 10 * 60)
+    store.record(ok(), ttft_slo_ms=3000, at=NOW)
+    assert list(store.buckets) == [NOW // 60]
+
+    path = str(tmp_path / "probe.json")
+    store.save(path)
+    loaded = probe.RollingStore()
+    loaded.load(path)
+    assert loaded.buckets == store.buckets
+
+
+def test_evaluate_fires_only_when_both_windows_burn():
+    store = probe.RollingStore()
+    # Failing for the last 5 minutes after a clean hour
+    for minute in range(60):
+        result = failed() if minute >= 55 else ok()
+        store.record(result, ttft_slo_ms=3000, at=NOW - (59 - minute) * 60)
+
+    report = probe.evaluate(store, availability=0.99, latency=0.95, now=NOW)
+    rates = report["slos"]["availability"]["burn_rates"]
+    assert rates["5m"] == pytest.approx(100.0)
+    assert rates["60m"] == pytest.approx(8.33, abs=0.01)
+    assert rates["30m"] == pytest.approx(16.67, abs=0.01)
+    # 5m burns past 14.4 but the hour doesn't yet: no page, but 6h/30m make a ticket
+    assert report["alerts"] == ["availability ticket: burn 8.3x over 360m"]
+    # The same probes are only 1.7x over the hour for the looser latency SLO
+    assert report["slos"]["latency"]["burn_rates"]["60m"] == pytest.approx(1.67, abs=0.01)
+
+
+@pytest.fixture
+def live_server(server):
+    """The app on a loopback port, its model replaced by tests.fakes"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    uv = uvicorn.Server(config)
+    thread = threading.Thread(target=uv.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not uv.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    uv.should_exit = True
+    thread.join(timeout=10)
+
+
+def test_probe_against_the_app(live_server):
+    result = asyncio.run(probe.probe_once(live_server, "3", timeout=5))
+    assert result["ok"], result
+    assert result["chunks"] == 3
+    assert result["trace_id"]
+    assert 0 <= result["connect_ms"] and 0 <= result["ttft_ms"] <= result["turn_ms"]
+
+
+def test_probe_reports_server_error_frames(server, live_server, monkeypatch):
+    def check_turn(tenant):
+        raise TenantError("Rate limit exceeded (1/min)", "rate_limited")
+
+    monkeypatch.setattr(server.tenants, "check_turn", check_turn)
+    start = time.monotonic()
+    result = asyncio.run(probe.probe_once(live_server, "3", timeout=30))
+    assert time.monotonic() - start < 5
+    assert not result["ok"]
+    assert result["code"] == "rate_limited"
+    assert result["error"] == "Rate limit exceeded (1/min)"
@@ -0,0 +1,20 @@
+import asyncio
+
+
+def test_lifespan_cancels_background_tasks_and_flushes_usage(server, monkeypatch):
+    flushed = []
+    monkeypatch.setattr(server.tenants, "usage_path", "unused.json")
+    monkeypatch.setattr(server.tenants, "flush", lambda: flushed.append(True))
+
+    async def run():
+        before = asyncio.all_tasks()
+        async with server.lifespan(server.app):
+            started = asyncio.all_tasks() - before
+            # loop lag, watchdog, idle sweeper, agents reload and usage flush
+            assert len(started) == 5
+            assert not flushed
+        return started
+
+    started = asyncio.run(run())
+    assert all(task.cancelled() for task in started)
+    assert flushed == [True]
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from app.multiplex import Multiplexer, MultiplexError
+
+
+async def noop_send(text):
+    pass
+
+
+@pytest.mark.parametrize("window", ["5", 0, -1, 2.5, True])
+def test_open_rejects_invalid_window(window):
+    async def run():
+        mux = Multiplexer(noop_send)
+        with pytest.raises(MultiplexError):
+            mux.open("a", window=window)
+        assert "a" not in mux.streams
+
+    asyncio.run(run())
+
+
+def test_open_keeps_valid_window_and_default():
+    async def run():
+        mux = Multiplexer(noop_send, window=8)
+        assert mux.open("a", window=3).credit == 3
+        assert mux.open("b").credit == 8
+        with pytest.raises(MultiplexError):
+            mux.get("a").grant("2")
+
+    asyncio.run(run())
+
+
+def test_invalid_window_is_an_error_frame_and_other_streams_keep_working(server):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/mux") as ws:
+            ws.send_json({"stream": "bad", "type": "open", "window": "5"})
+            assert ws.receive_json() == {
+                "stream": "bad", "error": "window must be a positive integer"
+            }
+            ws.send_json({"stream": "ok", "type": "open", "window": 2})
+            assert ws.receive_json() == {"stream": "ok", "opened": True}
+            ws.send_json({"stream": "ok", "type": "message", "text": "4"})
+            frames = [ws.receive_json() for _ in range(2)]
+            assert [f["message"] for f in frames] == ["0 ", "1 "]
+            ws.send_json({"stream": "ok", "type": "credit", "frames": 10})
+            rest = []
+            while not rest or not rest[-1].get("turn_complete"):
+                rest.append(ws.receive_json())
+            assert [f.get("message") for f in rest[:-1]] == ["2 ", "3 "]
+
+
+def test_failed_writer_closes_the_socket(server, monkeypatch):
+    async def broken_run(self):
+        await self.wakeup.wait()
+        raise RuntimeError("writer broke")
+
+    monkeypatch.setattr(Multiplexer, "run", broken_run)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/mux") as ws:
+            ws.send_json({"stream": "a", "type": "open"})
+            message = ws.receive()
+            assert message["type"] == "websocket.close"
+            assert message["code"] == 1011
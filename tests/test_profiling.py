@@ -0,0 +1,34 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app.profiling import SamplingProfiler, MIN_SAMPLE_INTERVAL
+
+
+@pytest.mark.parametrize("interval", [0, -1, float("nan")])
+def test_profiler_rejects_non_positive_interval(interval):
+    profiler = SamplingProfiler()
+    with pytest.raises(ValueError):
+        profiler.start(interval=interval)
+    assert not profiler.running
+
+
+def test_profiler_interval_is_clamped():
+    profiler = SamplingProfiler()
+    assert profiler.start(interval=1e-9)
+    try:
+        assert profiler.interval == MIN_SAMPLE_INTERVAL
+    finally:
+        profiler.stop()
+
+
+def test_profile_endpoint_rejects_bad_interval(server, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    headers = {"x-admin-token": "secret"}
+    with TestClient(server.app) as client:
+        response = client.post("/admin/profile/start?interval=-1", headers=headers)
+        assert response.status_code == 400
+        assert not server.profiler.running
+
+        response = client.post("/admin/profile/start?interval=0.00001", headers=headers)
+        assert response.json()["interval"] == MIN_SAMPLE_INTERVAL
+        assert client.post("/admin/profile/stop", headers=headers).status_code == 200
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+
+def receive_turn(ws):
+    frames = []
+    while not frames or not frames[-1].get("turn_complete"):
+        frames.append(ws.receive_json())
+    return frames
+
+
+def wait_for_seq(server, session_id, seq):
+    """Waits until the server has produced frame `seq` for a detached session"""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        live_session = server.resumable_sessions.get(("default", session_id))
+        if live_session is not None and live_session.seq >= seq:
+            return
+        time.sleep(0.01)
+    pytest.fail(f"session {session_id} never reached seq {seq}")
+
+
+def test_resume_replays_only_missed_frames(server):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/resume") as ws:
+            token = ws.receive_json()["resume_token"]
+            ws.send_text("40")
+            first = [ws.receive_json() for _ in range(5)]
+        # The socket dropped mid-answer; the answer keeps streaming into the buffer
+        assert [f["seq"] for f in first] == [1, 2, 3, 4, 5]
+        wait_for_seq(server, "resume", 20)
+
+        with client.websocket_connect(f"/ws/resume?last_seq=5&resume_token={token}") as ws:
+            handshake = ws.receive_json()
+            assert handshake["resumed"] and handshake["seq"] == 5
+            assert handshake["latest"] >= 20
+            rest = receive_turn(ws)
+
+            # 40 text frames + turn_complete, nothing repeated, nothing missing
+            assert [f["seq"] for f in rest] == list(range(6, 42))
+            messages = [f["message"] for f in first + rest if "message" in f]
+            assert messages == [f"{i} " for i in range(40)]
+
+            # The resumed socket carries the next turn as usual
+            ws.send_text("2")
+            assert [f["seq"] for f in receive_turn(ws)] == [42, 43, 44]
+
+
+def test_resume_after_buffer_overflow_is_refused(server, monkeypatch):
+    monkeypatch.setattr(server, "RESUME_BUFFER", 5)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/overflow") as ws:
+            token = ws.receive_json()["resume_token"]
+            ws.send_text("40")
+            assert [ws.receive_json()["seq"] for _ in range(2)] == [1, 2]
+        wait_for_seq(server, "overflow", 41)
+
+        with client.websocket_connect(f"/ws/overflow?last_seq=2&resume_token={token}") as ws:
+            # Frames 3..36 are gone: the client is told to start over from 41
+            assert ws.receive_json() == {"resumed": False, "seq": 41}
+            ws.send_text("1")
+            assert [f["seq"] for f in receive_turn(ws)] == [42, 43]
+
+
+def test_resume_within_buffer_after_overflow_boundary(server, monkeypatch):
+    monkeypatch.setattr(server, "RESUME_BUFFER", 5)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/edge") as ws:
+            token = ws.receive_json()["resume_token"]
+            ws.send_text("10")
+            receive_turn(ws)
+        with client.websocket_connect(f"/ws/edge?last_seq=6&resume_token={token}") as ws:
+            # Buffer holds 7..11: exactly what was missed
+            assert ws.receive_json() == {"resumed": True, "seq": 6, "latest": 11}
+            assert [ws.receive_json()["seq"] for _ in range(5)] == [7, 8, 9, 10, 11]
+
+
+def test_expired_session_cannot_be_resumed(server, monkeypatch):
+    monkeypatch.setattr(server, "RESUME_GRACE", 0.05)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/expired") as ws:
+            token = ws.receive_json()["resume_token"]
+            ws.send_text("1")
+            receive_turn(ws)
+        deadline = time.monotonic() + 5
+        while ("default", "expired") in server.resumable_sessions:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        with client.websocket_connect(f"/ws/expired?last_seq=2&resume_token={token}") as ws:
+            # A new session with a new token
+            assert ws.receive_json()["resume_token"] != token
+            assert ws.receive_json() == {"resumed": False, "seq": 0}
+
+
+@pytest.mark.parametrize("query", ["", "?last_seq=0", "?last_seq=0&resume_token=guess", "?resume_token={token}"])
+def test_session_id_alone_cannot_take_a_session_over(server, query):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/owned") as owner:
+            token = owner.receive_json()["resume_token"]
+            owner.send_text("2")
+            receive_turn(owner)
+
+            with client.websocket_connect("/ws/owned" + query.format(token=token)) as other:
+                assert other.receive_json() == {"error": "Session is in use", "code": "resume_refused"}
+                with pytest.raises(WebSocketDisconnect) as e:
+                    other.receive_json()
+                assert e.value.code == server.RESUME_REFUSED
+
+            # The owner keeps its session
+            owner.send_text("1")
+            assert [f.get("message") for f in receive_turn(owner)] == ["0 ", None]
+
+
+def test_resume_closes_the_socket_still_attached(server):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/taken") as old:
+            token = old.receive_json()["resume_token"]
+            old.send_text("2")
+            receive_turn(old)
+
+            with client.websocket_connect(f"/ws/taken?last_seq=3&resume_token={token}") as new:
+                assert new.receive_json() == {"resumed": True, "seq": 3, "latest": 3}
+                with pytest.raises(WebSocketDisconnect) as e:
+                    old.receive_json()
+                assert e.value.code == server.SESSION_REPLACED
+
+                new.send_text("1")
+                assert [f["seq"] for f in receive_turn(new)] == [4, 5]
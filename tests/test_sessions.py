@@ -0,0 +1,58 @@
+from starlette.testclient import TestClient
+
+from tests.fakes import agent_sessions
+
+
+def receive_turn(ws):
+    frames = []
+    while not frames or not frames[-1].get("turn_complete"):
+        frames.append(ws.receive_json())
+    return frames
+
+
+def test_same_client_id_gets_its_own_agent_session(server):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/mux") as first, client.websocket_connect("/mux") as second:
+            for ws in (first, second):
+                ws.send_json({"stream": "conv-1", "type": "open"})
+                assert ws.receive_json()["opened"]
+                ws.send_json({"stream": "conv-1", "type": "message", "text": "1"})
+                receive_turn(ws)
+            # Both conversations are "conv-1" of tenant "default", yet apart
+            assert len(agent_sessions) == 2
+            assert {user_id for user_id, _ in agent_sessions} == {"default"}
+            assert all(session_id != "conv-1" for _, session_id in agent_sessions)
+
+            first.send_json({"stream": "conv-1", "type": "close"})
+            assert first.receive_json()["closed"]
+            assert len(agent_sessions) == 1
+    # Closed with their sockets
+    assert not agent_sessions
+
+
+def test_reopened_stream_keeps_its_agent_session(server):
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/reopen") as ws:
+            ws.send_text("1")
+            receive_turn(ws)
+            live_session = server.resumable_sessions[("default", "reopen")]
+            opened = set(agent_sessions)
+            live_session.stop_live()
+            ws.send_text("1")
+            receive_turn(ws)
+            assert agent_sessions == opened == {("default", live_session.adk_session_id)}
+
+
+def test_expired_id_starts_a_new_agent_session(server, monkeypatch):
+    monkeypatch.setattr(server, "RESUME_GRACE", 0)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/reused") as ws:
+            ws.send_text("1")
+            receive_turn(ws)
+            first = server.resumable_sessions[("default", "reused")].adk_session_id
+        with client.websocket_connect("/ws/reused") as ws:
+            ws.send_text("1")
+            receive_turn(ws)
+            second = server.resumable_sessions[("default", "reused")].adk_session_id
+            assert first != second
+            assert agent_sessions == {("default", second)}
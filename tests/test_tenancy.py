@@ -0,0 +1,84 @@
+import pytest
+from starlette.testclient import TestClient
+
+from app.tenancy import TenantRegistry, TenantError
+
+
+def write_tenants(path, max_sessions=1, requests_per_minute=3):
+    path.write_text(
+        "[tenants.acme]\n"
+        'keys = ["key-1"]\n'
+        f"max_sessions = {max_sessions}\n"
+        f"requests_per_minute = {requests_per_minute}\n"
+    )
+
+
+def test_reload_keeps_sessions_of_live_connections(tmp_path):
+    path = tmp_path / "tenants.toml"
+    write_tenants(path)
+    registry = TenantRegistry(str(path))
+    tenant = registry.authenticate("key-1")
+    registry.admit(tenant)
+
+    write_tenants(path, max_sessions=2)
+    registry.load(str(path))
+    assert registry.authenticate("key-1") is tenant
+    assert tenant.max_sessions == 2
+
+    # The connection opened before the reload gives its slot back
+    registry.release(tenant)
+    registry.admit(registry.authenticate("key-1"))
+    registry.admit(registry.authenticate("key-1"))
+    with pytest.raises(TenantError) as e:
+        registry.admit(registry.authenticate("key-1"))
+    assert e.value.code == "too_many_sessions"
+
+
+def test_reload_keeps_the_rate_limit_bucket(tmp_path):
+    path = tmp_path / "tenants.toml"
+    write_tenants(path, requests_per_minute=3)
+    registry = TenantRegistry(str(path))
+    tenant = registry.authenticate("key-1")
+    for _ in range(3):
+        registry.check_turn(tenant)
+
+    # Reloading (even with a higher limit) doesn't hand out a fresh bucket
+    write_tenants(path, requests_per_minute=6)
+    registry.load(str(path))
+    with pytest.raises(TenantError) as e:
+        registry.check_turn(tenant)
+    assert e.value.code == "rate_limited"
+
+    # A lower limit caps what is left
+    tenant.allowance = 5
+    write_tenants(path, requests_per_minute=2)
+    registry.load(str(path))
+    assert tenant.allowance == 2
+
+
+def test_failed_reload_keeps_current_tenants(tmp_path):
+    path = tmp_path / "tenants.toml"
+    write_tenants(path)
+    registry = TenantRegistry(str(path))
+    tenant = registry.authenticate("key-1")
+
+    path.write_text('[tenants.acme]\nkeys = ["key-2"]\nmax_session = 1\n')
+    with pytest.raises(TypeError):
+        registry.load(str(path))
+    assert registry.authenticate("key-1") is tenant
+    assert tenant.keys == {"key-1"}
+
+
+def test_page_reload_resumes_instead_of_taking_a_second_slot(server, tmp_path, monkeypatch):
+    path = tmp_path / "tenants.toml"
+    write_tenants(path, max_sessions=1)
+    monkeypatch.setattr(server, "tenants", TenantRegistry(str(path)))
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/page?api_key=key-1") as ws:
+            token = ws.receive_json()["resume_token"]
+        # The reloaded page comes back with the session id and token it kept
+        with client.websocket_connect(f"/ws/page?api_key=key-1&last_seq=0&resume_token={token}") as ws:
+            assert ws.receive_json() == {"resumed": True, "seq": 0, "latest": 0}
+            # A new session id would need a second slot
+            with client.websocket_connect("/ws/other?api_key=key-1") as other:
+                assert other.receive_json()["code"] == "too_many_sessions"
@@ -0,0 +1,43 @@
+import pytest
+from starlette.testclient import TestClient
+
+from tests.fakes import fake_event, fake_start_agent_session, text_chunk
+
+
+def broken_stream(fail):
+    """A live stream that answers one chunk, then raises or just ends"""
+    def start(session_id, user_id=None, profile=None):
+        _, queue = fake_start_agent_session(session_id, user_id, profile)
+
+        async def live_events():
+            await queue.messages.get()
+            yield text_chunk("0 ")
+            if fail:
+                raise RuntimeError("upstream went away")
+
+        return live_events(), queue
+    return start
+
+
+@pytest.mark.parametrize("fail", [True, False])
+def test_stream_cut_off_mid_turn_ends_the_turn(server, monkeypatch, fail):
+    monkeypatch.setattr(server, "start_agent_session", broken_stream(fail))
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/broken") as ws:
+            assert "resume_token" in ws.receive_json()
+            ws.send_text("hello")
+            assert ws.receive_json()["message"] == "0 "
+            error = ws.receive_json()
+            assert error["code"] == "upstream_error"
+            assert error["trace_id"]
+
+            live_session = server.resumable_sessions[("default", "broken")]
+            assert live_session.tracer.current is None
+            assert not live_session.meter.open
+            assert server.trace_exporter.report()["recent"][-1]["status"] == "error"
+
+            # The next message reopens the stream
+            monkeypatch.setattr(server, "start_agent_session", fake_start_agent_session)
+            ws.send_text("1")
+            assert ws.receive_json()["message"] == "0 "
+            assert ws.receive_json()["turn_complete"]